@@ -99,6 +99,7 @@ kwargs = {'author': 'Scott E. Townsend',
                                   'test/GE90.xml.new_CompGeom.txt',
                                   'test/GE90.xml',
                                   'test/m6_singleside.xml',
+                                  'test/xsec.hrm',
                                   'test/hwb.xml.new_CompGeom.csv',
                                   'test/eagle_eye.xml.new_CompGeom.txt',
                                   'test/test_wrapper.py',
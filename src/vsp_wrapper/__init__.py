@@ -8,6 +8,7 @@ and then VSP is run in batch mode.
 
 from __future__ import absolute_import
 
-from .wrapper import VSP
+from .wrapper import VSP, run_concurrently
+from .batch import VSPBatch
 #from .parageom import VSPParametricGeometry, VSPSender
 
@@ -1,4 +1,6 @@
-from openmdao.lib.datatypes.api import Bool, Enum, Float, Int, Str
+from numpy import zeros
+
+from openmdao.lib.datatypes.api import Array, Bool, Enum, Float, Int, Str
 
 from vsp_wrapper.xml_container import XMLContainer
 
@@ -73,14 +75,15 @@ class Airfoil(XMLContainer):
                                  desc=''))
             self.read_element(this, 'radius_te_correction_factor')
 
-# TODO: handle arrays.
             self.add_trait('upper_pnts',
-                           Str(iotype='in', xmltag='Upper_Pnts',
-                               desc=''))
+                           Array(zeros((0, 2)), iotype='in',
+                                 xmltag='Upper_Pnts', group=2,
+                                 desc='Upper surface (x, y) points.'))
             self.read_element(this, 'upper_pnts')
 
             self.add_trait('lower_pnts',
-                           Str(iotype='in', xmltag='Lower_Pnts',
-                               desc=''))
+                           Array(zeros((0, 2)), iotype='in',
+                                 xmltag='Lower_Pnts', group=2,
+                                 desc='Lower surface (x, y) points.'))
             self.read_element(this, 'lower_pnts')
 
@@ -0,0 +1,202 @@
+"""
+Evaluate many design points of one VSP model using a pool of processes.
+
+Each worker process reads the base XML file once, then for every design
+point sets the requested parameters, runs VSP in a private scratch
+directory and returns the requested outputs.
+"""
+
+import multiprocessing
+import os
+import Queue
+
+import numpy
+
+from openmdao.main.api import set_as_top
+from openmdao.main.component import SimulationRoot
+
+from vsp_wrapper.wrapper import VSP
+
+# Per-process state of a worker.
+_INIT_ERROR = None
+_VSP = None
+_OUTPUTS = ()
+_BASELINE = {}
+
+
+class BatchResults(object):
+    """
+    Results of a batch. `outputs` maps output name to an array of values in
+    input order, with NaN for failed points. `errors` holds an error message
+    for each failed point, None otherwise.
+    """
+
+    def __init__(self, names, npoints):
+        self.outputs = dict((name, numpy.empty(npoints)) for name in names)
+        for values in self.outputs.values():
+            values.fill(numpy.nan)
+        self.errors = [None] * npoints
+
+    @property
+    def failed(self):
+        """ Boolean array, True where a point failed. """
+        return numpy.array([error is not None for error in self.errors],
+                           dtype=bool)
+
+
+class VSPBatch(object):
+    """
+    Evaluates design points of the model in `xml_filename` using up to
+    `processes` VSP runs at once (default is the number of CPUs).
+    `options` is a dictionary of :class:`VSP` input values applied to every
+    point, for example ``{'vsp_path': '/opt/vsp/vsp', 'write_stereo': True}``.
+    With ``'use_snapshots': True`` workers load the model from a snapshot.
+    A run taking longer than `timeout` seconds is killed and reported as
+    failed (zero implies no limit).
+    """
+
+    OUTPUTS = ('theoretical_area', 'wetted_area',
+               'theoretical_volume', 'wetted_volume',
+               'horiz_wet_area', 'vert_wet_area',
+               'wing_wet_area', 'fuse_wet_area')
+
+    def __init__(self, xml_filename, processes=None, options=None,
+                 timeout=0., outputs=None, directory=None):
+        self.xml_filename = os.path.abspath(xml_filename)
+        self.processes = processes or multiprocessing.cpu_count()
+        self.options = dict(options or {})
+        self.timeout = timeout
+        self.outputs = tuple(outputs or self.OUTPUTS)
+        self.directory = os.path.abspath(directory or
+                                         os.path.dirname(self.xml_filename))
+
+    def run(self, points, names=None):
+        """
+        Evaluate `points` and return :class:`BatchResults`.
+        `points` is either a list of dictionaries mapping parameter path
+        (for example ``'geometry.Wing.wing_parms.sweep'``) to value, or a 2-D
+        array with one row per point and one column per entry in `names`.
+        """
+        points = self._as_dicts(points, names)
+        results = BatchResults(self.outputs, len(points))
+        for index, values, error in self.imap(points, ordered=False):
+            if error is None:
+                for name, value in zip(self.outputs, values):
+                    results.outputs[name][index] = value
+            else:
+                results.errors[index] = error
+        return results
+
+    def imap(self, points, names=None, ordered=True):
+        """
+        Generator over results of evaluating `points` (see :meth:`run`).
+        Yields ``(index, values, error)`` tuples, where `values` is a tuple of
+        outputs (None if the point failed) and `error` is a message (None if
+        the point succeeded). If `ordered` is False, results are delivered as
+        they complete rather than in input order.
+        """
+        points = self._as_dicts(points, names)
+        if not points:
+            return
+
+        pool = multiprocessing.Pool(min(self.processes, len(points)),
+                                    _init_worker,
+                                    (self.xml_filename, self.options,
+                                     self.timeout, self.outputs,
+                                     self.directory))
+        try:
+            if ordered:
+                pending = [pool.apply_async(_evaluate, (i, point))
+                           for i, point in enumerate(points)]
+                for result in pending:
+                    # A timeout allows KeyboardInterrupt to be seen.
+                    while True:
+                        try:
+                            value = result.get(1.)
+                        except multiprocessing.TimeoutError:
+                            continue
+                        break
+                    yield value
+            else:
+                done = Queue.Queue()
+                for i, point in enumerate(points):
+                    pool.apply_async(_evaluate, (i, point),
+                                     callback=done.put)
+                for i in range(len(points)):
+                    # A timeout allows KeyboardInterrupt to be seen.
+                    while True:
+                        try:
+                            result = done.get(True, 1.)
+                        except Queue.Empty:
+                            continue
+                        break
+                    yield result
+            pool.close()
+        except BaseException:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+
+    @staticmethod
+    def _as_dicts(points, names):
+        """ Return `points` as a list of dictionaries. """
+        if names is None:
+            return list(points)
+        points = numpy.atleast_2d(numpy.asarray(points, dtype=float))
+        if points.shape[1] != len(names):
+            raise ValueError('Expecting %d columns, got %d'
+                             % (len(names), points.shape[1]))
+        return [dict(zip(names, row)) for row in points]
+
+
+def _init_worker(xml_filename, options, timeout, outputs, directory):
+    """
+    Read the base model in a new worker process. Errors are recorded and
+    reported for each point, since a pool whose initializer raises keeps
+    replacing its workers and never completes.
+    """
+    global _INIT_ERROR, _VSP, _OUTPUTS
+    _OUTPUTS = outputs
+    try:
+        os.chdir(directory)
+        SimulationRoot.chroot(directory)
+        use_snapshots = options.get('use_snapshots', False)
+        snapshot_dir = options.get('snapshot_dir', '')
+        _VSP = set_as_top(VSP(xml_filename, use_snapshots=use_snapshots,
+                              snapshot_dir=snapshot_dir))
+        for name, value in options.items():
+            _VSP.set(name, value)
+        _VSP.scratch_dirs = True
+        _VSP.timeout = timeout
+    except Exception as exc:
+        _INIT_ERROR = 'Worker setup failed: %s: %s' \
+                      % (exc.__class__.__name__, exc)
+
+
+def _evaluate(index, point):
+    """ Evaluate one design point. Returns ``(index, values, error)``. """
+    if _INIT_ERROR is not None:
+        return (index, None, _INIT_ERROR)
+    try:
+        # Restore parameters set by the previous point but not by this one.
+        for name, value in _BASELINE.items():
+            if name not in point:
+                _VSP.set(name, value)
+
+        for name, value in point.items():
+            current = _VSP.get(name)
+            if name not in _BASELINE:
+                _BASELINE[name] = current
+            if isinstance(current, bool):
+                value = bool(value)
+            elif isinstance(current, int):
+                value = int(round(value))
+            elif isinstance(current, float):
+                value = float(value)
+            _VSP.set(name, value)
+
+        _VSP.run()
+        return (index, tuple(_VSP.get(name) for name in _OUTPUTS), None)
+    except Exception as exc:
+        return (index, None, '%s: %s' % (exc.__class__.__name__, exc))
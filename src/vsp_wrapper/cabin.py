@@ -42,7 +42,7 @@ class CabinLayoutParms(XMLContainer):
     XMLTAG = 'Cabin_Layout_Parms'
 
     geom_filename = Str(iotype='in', xmltag='Geom_Data_File_Name',
-                        desc='')
+                        input_file=True, desc='')
     mirror_active = Bool(False, iotype='in', xmltag='Mirror_Active',
                          desc='')
 
@@ -0,0 +1,167 @@
+"""
+Content-addressed cache of VSP results.
+
+Entries are keyed by a hash of the XML file written for VSP, the VSP
+command line, and the contents of files referenced by the model. Each entry
+is a directory holding copies of the files VSP produced. Entries are
+published and evicted by renaming whole directories, so several processes
+may share one cache directory: a reader either sees a complete entry or no
+entry at all.
+"""
+
+import errno
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+
+
+class ResultCache(object):
+    """
+    Cache of VSP output files stored under `directory`, limited to
+    `max_size` bytes with least-recently-used eviction.
+    """
+
+    def __init__(self, directory, max_size):
+        self.directory = os.path.abspath(directory)
+        self.max_size = max_size
+        _makedirs(self.directory)
+
+    @staticmethod
+    def make_key(xml_filename, cmd, input_files=()):
+        """
+        Return key for running command line `cmd` on `xml_filename`.
+        The XML filename itself is part of `cmd`, so models with identical
+        content but different names get different keys (VSP embeds the
+        name in some of its outputs). The contents of `input_files`
+        (files referenced by the model) are included, a missing file is
+        hashed as such.
+        """
+        sha = hashlib.sha1()
+        with open(xml_filename, 'rb') as inp:
+            sha.update(inp.read())
+        sha.update('\0'.join(cmd))
+        update_file_hashes(sha, input_files)
+        return sha.hexdigest()
+
+    def _entry_path(self, key):
+        """ Return path to entry directory for `key`. """
+        return os.path.join(self.directory, key[:2], key)
+
+    def fetch(self, key, dest):
+        """
+        Copy files for `key` into directory `dest`.
+        Returns list of names copied, or None if there is no entry.
+        """
+        path = self._entry_path(key)
+        try:
+            names = os.listdir(path)
+        except OSError:
+            return None
+
+        copied = []
+        try:
+            for name in names:
+                shutil.copyfile(os.path.join(path, name),
+                                os.path.join(dest, name))
+                copied.append(name)
+            os.utime(path, None)  # Mark as recently used.
+        except (IOError, OSError):
+            # Entry was evicted by another process while we were copying.
+            for name in copied:
+                _remove(os.path.join(dest, name))
+            return None
+        return names
+
+    def store(self, key, src, names):
+        """ Store files `names` found in directory `src` under `key`. """
+        path = self._entry_path(key)
+        if os.path.exists(path):
+            return
+
+        parent = os.path.dirname(path)
+        _makedirs(parent)
+        tmp = tempfile.mkdtemp(prefix='.tmp-', dir=self.directory)
+        try:
+            for name in names:
+                filename = os.path.join(src, name)
+                if os.path.exists(filename):
+                    shutil.copyfile(filename, os.path.join(tmp, name))
+            try:
+                os.rename(tmp, path)
+            except OSError:
+                # Another process published this entry first.
+                shutil.rmtree(tmp, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+
+        self.evict()
+
+    def evict(self):
+        """ Remove least-recently-used entries until within `max_size`. """
+        entries = []
+        total = 0
+        for prefix in os.listdir(self.directory):
+            parent = os.path.join(self.directory, prefix)
+            if prefix.startswith('.') or not os.path.isdir(parent):
+                continue
+            for key in os.listdir(parent):
+                path = os.path.join(parent, key)
+                try:
+                    mtime = os.path.getmtime(path)
+                    size = sum(os.path.getsize(os.path.join(path, name))
+                               for name in os.listdir(path))
+                except OSError:
+                    continue  # Concurrently evicted.
+                entries.append((mtime, size, path))
+                total += size
+
+        if total <= self.max_size:
+            return
+
+        entries.sort()
+        for mtime, size, path in entries:
+            tmp = os.path.join(self.directory,
+                               '.evict-%s-%d-%f' % (os.path.basename(path),
+                                                    os.getpid(), time.time()))
+            try:
+                os.rename(path, tmp)
+            except OSError:
+                continue  # Concurrently evicted.
+            shutil.rmtree(tmp, ignore_errors=True)
+            total -= size
+            if total <= self.max_size:
+                break
+
+
+def update_file_hashes(sha, paths):
+    """
+    Update hash object `sha` with each of `paths` and a hash of its
+    contents, a missing file is hashed as such.
+    """
+    for path in paths:
+        sha.update('\0%s\0' % path)
+        try:
+            with open(path, 'rb') as inp:
+                sha.update(hashlib.sha1(inp.read()).hexdigest())
+        except IOError:
+            sha.update('missing')
+
+
+def _makedirs(path):
+    """ Create directory `path`, tolerating concurrent creation. """
+    try:
+        os.makedirs(path)
+    except OSError as exc:
+        if exc.errno != errno.EEXIST:
+            raise
+
+
+def _remove(path):
+    """ Remove file `path` if it exists. """
+    try:
+        os.remove(path)
+    except OSError:
+        pass
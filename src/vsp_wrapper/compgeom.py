@@ -0,0 +1,58 @@
+"""
+Read VSP CompGeom results.
+
+``<base>_CompGeom.csv`` has a header line, one row per component part with
+name, theoretical area, wetted area, theoretical volume, and wetted volume,
+then a final row of totals.
+"""
+
+import csv
+
+import numpy
+
+# Numeric fields of a CompGeom row, in CSV column order.
+FIELDS = ('theoretical_area', 'wetted_area',
+          'theoretical_volume', 'wetted_volume')
+
+
+def read_comp_geom(path):
+    """
+    Returns ``(table, totals)`` from CompGeom CSV file `path`. `table` is a
+    structured array with a `name` field and :data:`FIELDS`, one record per
+    component row. `totals` is a tuple of :data:`FIELDS` values.
+    """
+    with open(path, 'rb') as inp:
+        reader = csv.reader(inp)
+        next(reader)
+        rows = [row for row in reader if row]
+
+    if not rows:
+        raise ValueError('%s: no totals row' % path)
+    for row in rows:
+        if len(row) != len(FIELDS) + 1:
+            raise ValueError('%s: expecting %d columns, got %r'
+                             % (path, len(FIELDS) + 1, row))
+
+    totals = tuple([float(value) for value in rows[-1][1:]])
+    rows = [(row[0].strip(),) + tuple([float(value) for value in row[1:]])
+            for row in rows[:-1]]
+    width = max([len(row[0]) for row in rows] + [1])
+    return (numpy.array(rows, dtype=_dtype(width)), totals)
+
+
+def empty_table():
+    """ Returns CompGeom table with no rows. """
+    return numpy.zeros(0, dtype=_dtype(1))
+
+
+def _dtype(width):
+    """ Returns table dtype for names up to `width` characters. """
+    return [('name', 'S%d' % width)] + [(field, float) for field in FIELDS]
+
+
+def index_names(table):
+    """ Returns dictionary mapping name to list of row indices in `table`. """
+    index = {}
+    for i, name in enumerate(table['name']):
+        index.setdefault(name, []).append(i)
+    return index
@@ -1,6 +1,8 @@
 import xml.etree.cElementTree as ElementTree
 
-from openmdao.lib.datatypes.api import Bool, Enum, Float, Int, Str
+from numpy import zeros
+
+from openmdao.lib.datatypes.api import Array, Bool, Enum, Float, Int, Str
 
 from vsp_wrapper.component     import VSPComponent
 from vsp_wrapper.xml_container import XMLContainer
@@ -228,19 +230,19 @@ class MLParms(XMLContainer):
         if self.type == _FROM_FILE:
             self.add_trait('file_name',
                            Str(iotype='in', xmltag='File_Name',
-                           desc=''))
+                           input_file=True, desc=''))
             self.read_element(this, 'file_name')
 
-# TODO: handle array.
             self.add_trait('file_y_pnts',
-                           Str(iotype='in', xmltag='File_Y_Pnts',
-                           desc=''))
+                           Array(zeros(0), iotype='in',
+                                 xmltag='File_Y_Pnts', group=1,
+                                 desc='Y coordinates of file points.'))
             self.read_element(this, 'file_y_pnts')
 
-# TODO: handle array.
             self.add_trait('file_z_pnts',
-                           Str(iotype='in', xmltag='File_Z_Pnts',
-                           desc=''))
+                           Array(zeros(0), iotype='in',
+                                 xmltag='File_Z_Pnts', group=1,
+                                 desc='Z coordinates of file points.'))
             self.read_element(this, 'file_z_pnts')
 
 
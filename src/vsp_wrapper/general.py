@@ -23,27 +23,33 @@ class GeneralParms(XMLContainer):
     """ General XML parameters for a component. """
 
     XMLTAG = 'General_Parms'
+    XML_HANDLED = ('Children_PtrID',)
 
     part_name = Str('Default_Name', iotype='in', xmltag='Name',
                     desc='Name for this part, may contain spaces.')
     color_r = Float(0.0, low=0., high=255., iotype='in', xmltag='ColorR',
+                    affects='display',
                     desc='Red component of displayed color.')
     color_g = Float(0.0, low=0., high=255., iotype='in', xmltag='ColorG',
+                    affects='display',
                     desc='Green component of displayed color.')
     color_b = Float(255.0, low=0., high=255., iotype='in', xmltag='ColorB',
+                    affects='display',
                     desc='Blue component of displayed color.')
     symmetry = Enum(_NO_SYM, iotype='in', xmltag='Symmetry',
                     values=(_NO_SYM, _XY_SYM, _XZ_SYM, _YZ_SYM),
                     aliases=('None', 'XY', 'XZ', 'YZ'),
                     desc='Symmetry plane.')
     material_id = Int(0, low=0, iotype='in', xmltag='MaterialID',
+                      affects='display',
                       desc='Material identifier, sets display.')
     output_flag = Bool(True, iotype='in', xmltag='OutputFlag',
                        desc='')
     output_name_id = Int(0, iotype='in', xmltag='OutputNameID',
-                         desc='')
+                         affects='display', desc='')
     display_children_flag = Bool(True, iotype='in',
                                  xmltag='DisplayChildrenFlag',
+                                 affects='display',
                                  desc='If True, child parts are listed in the'
                                       ' geometry browser window.')
     num_pnts = Int(21, low=9, high=1001, iotype='in', xmltag='NumPnts',
@@ -141,6 +147,10 @@ class GeneralParms(XMLContainer):
         self._sources  = []
         self._fea_data = []
 
+    def update_signature_data(self, sha):
+        """ Update hash object `sha` with child pointers. """
+        sha.update('\n_children=%r' % (self._children,))
+
     def read(self, this):
         """ Read parameters from XML tree element `this`. """
         super(GeneralParms, self).read(this)
@@ -1,3 +1,4 @@
+import hashlib
 import xml.etree.cElementTree as ElementTree
 
 from openmdao.lib.datatypes.api import Bool, Float, Int, Str
@@ -19,7 +20,7 @@ from vsp_wrapper.prop          import Prop
 from vsp_wrapper.user          import User
 from vsp_wrapper.window        import VirtWindow
 from vsp_wrapper.wing          import Wing
-from vsp_wrapper.xml_container import XMLContainer, XLATE
+from vsp_wrapper.xml_container import XMLContainer, XLATE, copy_element
 
 
 # Map from component 'Type' element to class.
@@ -47,10 +48,20 @@ _register(Wing)
 
 
 class VSPGeometry(XMLContainer):
-    """ XML parameters for a vehicle. """
+    """
+    XML parameters for a vehicle.
+
+    Components are read lazily: each is kept as its XML element until first
+    accessed as an attribute, and untouched components are written back
+    verbatim. :meth:`list_components` returns all component names,
+    :meth:`materialize_all` reads any components not yet accessed.
+    """
 
     XMLTAG = 'Vsp_Geometry'
 
+    # Tags of `input_file` parameters, for scanning unread components.
+    INPUT_FILE_TAGS = ('File_Name', 'Geom_Data_File_Name', 'Texture_Name')
+
     version = Int(3, iotype='in', xmltag='Version',
                   desc='')
     geom_name = Str('Aircraft', iotype='in', xmltag='Name',
@@ -64,12 +75,103 @@ class VSPGeometry(XMLContainer):
     cg_z = Float(0.0, iotype='in', xmltag='CG_Z',
                  desc='')
     cfd_mesh_base_length = Float(0.5, iotype='in', xmltag='CFD_Mesh_Base_Length',
-                                 desc='')
+                                 affects='cfd_mesh', desc='')
 
     def __init__(self):
         super(VSPGeometry, self).__init__(self.XMLTAG)
         self._virt_windows = []
-        self._components = []
+        self._components = []  # (name, element) in precedence order.
+        self._elements = {}    # Name => element (last one if duplicated).
+        self._lazy = set()     # Names of components not yet read.
+        self._frozen = None    # (tree, changes, root) shared by clones.
+        # (id(element), ignore) => (element, digest), shared with clones.
+        self._signatures = {}
+
+    def __getstate__(self):
+        """ Return dict representing this geometry's state. """
+        state = super(VSPGeometry, self).__getstate__()
+        # Elements aren't picklable, save unread components as text.
+        state['_components'] = [(name, ElementTree.tostring(element))
+                                for name, element in self._components]
+        state['_elements'] = None
+        state['_frozen'] = None
+        state['_signatures'] = {}
+        return state
+
+    def __setstate__(self, state):
+        """ Restore this geometry's state. """
+        super(VSPGeometry, self).__setstate__(state)
+        components = []
+        elements = {}
+        for name, text in self._components:
+            element = ElementTree.fromstring(text)
+            components.append((name, element))
+            elements[name] = element
+        self._components = components
+        self._elements = elements
+
+    def __getattr__(self, name):
+        """ Read component `name` on first access. """
+        lazy = self.__dict__.get('_lazy')
+        if lazy and name in lazy:
+            return self._materialize(name)
+        raise AttributeError("'%s' object has no attribute '%s'"
+                             % (self.__class__.__name__, name))
+
+    def _materialize(self, name):
+        """ Read component `name` from its element. """
+        self._lazy.discard(name)
+        element = self._elements[name]
+        comp = self.add(name, _REGISTRY[element.findtext('Type')]())
+        comp.read(element)
+        return comp
+
+    def _is_verbatim(self, name, element):
+        """
+        Returns True if component `element` is to be written verbatim,
+        either not yet read or hidden by a later component of the same name.
+        """
+        return name in self._lazy or element is not self._elements[name]
+
+    def clone(self):
+        """
+        Returns a copy of this geometry. The copy shares the XML data of all
+        components with this geometry and with other copies. Like any
+        geometry, a component is only read (into its own containers) when
+        first accessed, so memory grows with the components a copy touches.
+        Later changes to this geometry do not affect existing copies.
+        Signature digests of shared components are shared as well.
+        """
+        geometry = VSPGeometry()
+        geometry.read(self._frozen_root())
+        geometry._signatures = self._signatures
+        return geometry
+
+    def _frozen_root(self):
+        """
+        Returns XML tree reflecting the current state, which is never
+        modified. It's rebuilt only if this geometry has changed since the
+        last call. Components written verbatim are shared, not copied.
+        """
+        root = self.write_tree()
+        tree = self._tree
+        frozen = self._frozen
+        if frozen is None or frozen[0] is not tree or frozen[1] != tree.changes:
+            shared = set([id(element) for name, element in self._components
+                          if self._is_verbatim(name, element)])
+            frozen = (tree, tree.changes, copy_element(root, shared))
+            self._frozen = frozen
+        return frozen[2]
+
+    def list_components(self):
+        """ Returns names of all components, in precedence order. """
+        return [name for name, element in self._components]
+
+    def materialize_all(self):
+        """ Read all components not yet accessed. """
+        for name, element in self._components:
+            if name in self._lazy:
+                self._materialize(name)
 
     def read(self, this):
         """ Read parameters from XML tree element `this`. """
@@ -91,12 +193,39 @@ class VSPGeometry(XMLContainer):
         if component_list is None:
             self.raise_exception('No Component_List!?', RuntimeError)
         components = component_list.findall(VSPComponent.XMLTAG)
+
+        # Add components in precedence order (read on first access).
+        for element in self._precedence_order(components):
+            typ = element.findtext('Type')
+            if typ == User.XMLTYPE:
+                name = 'User'
+            else:
+                parms = element.find('General_Parms')
+                name = parms.findtext('Name')
+                if name is None:
+                    self.raise_exception('No component Name!?', RuntimeError)
+                name = name.translate(XLATE)
+
+            if typ not in _REGISTRY:
+                self.raise_exception('Unexpected type %s' % typ, RuntimeError)
+            self._components.append((name, element))
+            self._elements[name] = element
+            self._lazy.add(name)
+
+    def _precedence_order(self, components):
+        """
+        Returns `components` ordered so that each parent precedes
+        its children. Siblings keep their document order, and any 'User'
+        component is last. Runs in linear time.
+        """
         user_element = None
-        precedence_list = []
+        children = {}  # Parent PtrID => [(element, PtrID)] in document order.
+        ptr_ids = set()
+        count = 0
         for element in components:
             typ = element.findtext('Type')
             if typ is None:
-                self.throw(RuntimeError, 'No component Type!?')
+                self.raise_exception('No component Type!?', RuntimeError)
 
             if typ == User.XMLTYPE:
                 # Not part of precedence list.
@@ -114,49 +243,83 @@ class VSPGeometry(XMLContainer):
             if parent_id is None:
                 self.raise_exception('No component Parent_PtrID!?', RuntimeError)
 
-            for i, info in enumerate(precedence_list):
-                if info[1] == parent_id:  # This comp is child.
-                    precedence_list.insert(i+1, (element, ptr_id, parent_id))
-                    break
-                elif info[2] == ptr_id:   # This comp is parent.
-                    precedence_list.insert(i, (element, ptr_id, parent_id))
-            else:
-                precedence_list.append((element, ptr_id, parent_id))
+            children.setdefault(parent_id, []).append((element, ptr_id))
+            ptr_ids.add(ptr_id)
+            count += 1
 
-        if user_element is not None:
-            precedence_list.append((user_element, None, '0'))
+        # Depth-first preorder from the top-level components.
+        order = []
+        expanded = set()
+        stack = list(reversed(children.get('0', [])))
+        while stack:
+            element, ptr_id = stack.pop()
+            order.append(element)
+            if ptr_id not in expanded:  # Tolerate duplicate PtrIDs.
+                expanded.add(ptr_id)
+                stack.extend(reversed(children.get(ptr_id, [])))
 
-        # Add components in precedence order.
-        parent_map = {}
-        for element, ptr_id, parent_id in precedence_list:
-            typ = element.findtext('Type')
-            if typ == User.XMLTYPE:
-                name = 'User'
-            else:
-                parms = element.find('General_Parms')
-                name = parms.findtext('Name')
-                if name is None:
-                    self.raise_exception('No component Name!?', RuntimeError)
-                name = name.translate(XLATE)
-
-            # Find parent component.
-            if parent_id == '0':
-                parent = self
-            else:
-                try:
-                    parent = parent_map[parent_id]
-                except KeyError:
+        if len(order) != count:
+            for parent_id in children:
+                if parent_id != '0' and parent_id not in ptr_ids:
                     self.raise_exception('Cannot find parent!', RuntimeError)
+            self.raise_exception('Component parent cycle!?', RuntimeError)
 
-            # Read component data.
-            try:
-                comp = self.add(name, _REGISTRY[typ]())
-            except KeyError:
-                self.throw(RuntimeError, 'Unexpected type %s', typ)
+        if user_element is not None:
+            order.append(user_element)
+        return order
 
-            comp.read(element)
-            parent_map[ptr_id] = comp
-            self._components.append(comp)
+    def input_files(self):
+        """
+        Return paths of files referenced by parameters with `input_file`
+        metadata, such as cross-section and texture files.
+        """
+        paths = []
+        for container in self.xml_containers():
+            for name, value in container.items(input_file=True):
+                if value and value not in paths:
+                    paths.append(value)
+        for name, element in self._components:
+            if not self._is_verbatim(name, element):
+                continue
+            for tag in self.INPUT_FILE_TAGS:
+                for child in element.getiterator(tag):
+                    value = child.text
+                    if value and value not in paths:
+                        paths.append(value)
+        return paths
+
+    def update_signature(self, sha, ignore=()):
+        """
+        Update hash object `sha` with the inputs of this geometry, skipping
+        parameters classified in `ignore`. The result is the same whether
+        or not components have been read: an unread component is hashed as
+        it would be once read (its digest is kept for reuse).
+        """
+        self.update_parameter_signature(sha, ignore)
+        components = set([name for name, element in self._components])
+        for name in sorted(self.list_containers()):
+            obj = getattr(self, name)
+            if name not in components and isinstance(obj, XMLContainer):
+                sha.update('\n[%s]' % name)
+                obj.update_signature(sha, ignore)
+
+        for name, element in self._components:
+            sha.update('\n[%s]' % name)
+            if self._is_verbatim(name, element):
+                # The element is kept with its digest, so its id can't be
+                # reused by another element while the entry exists.
+                key = (id(element), tuple(ignore))
+                entry = self._signatures.get(key)
+                if entry is not None and entry[0] is element:
+                    digest = entry[1]
+                else:
+                    comp = _REGISTRY[element.findtext('Type')]()
+                    comp.read(element)
+                    digest = _digest(comp, ignore)
+                    self._signatures[key] = (element, digest)
+            else:
+                digest = _digest(getattr(self, name), ignore)
+            sha.update(digest)
 
     def write(self, root, nesting=0):
         """
@@ -175,8 +338,12 @@ class VSPGeometry(XMLContainer):
         component_list = ElementTree.Element('Component_List')
         component_list.text = self.tail(nesting+2)
         component_list.tail = self.tail(nesting+1)
-        for component in self._components:
-            component.write(component_list, nesting+2)
+        for name, element in self._components:
+            if self._is_verbatim(name, element):
+                element.tail = self.tail(nesting+2)
+                component_list.append(element)
+            else:
+                getattr(self, name).write(component_list, nesting+2)
         this.append(component_list)
 
         label_list = ElementTree.Element('Label_List')
@@ -191,3 +358,9 @@ class VSPGeometry(XMLContainer):
 
         return this
 
+
+def _digest(comp, ignore):
+    """ Returns signature digest of component `comp`. """
+    sha = hashlib.sha1()
+    comp.update_signature(sha, ignore)
+    return sha.digest()
@@ -0,0 +1,97 @@
+"""
+Read VSP Hermite (``-xsec``) cross-section files.
+
+After a short header, each component is written as its name, lines of
+``KEY = value`` (group number, type, cross section flag, symmetry flag,
+number of cross sections and number of points per cross section, written
+by VSP as ``NUMBER OF XSECS`` and ``NUMBER OF PTS/XSEC``), then one
+``x y z`` line per point, cross section by cross section. The counts are
+also accepted spelled as ``CROSS SECTIONS`` rather than ``XSECS``.
+"""
+
+import itertools
+
+import numpy
+
+
+class HermiteComponent(object):
+    """
+    Cross sections of one component. `points` is a (sections, points, 3)
+    float array, `info` the component's ``KEY = value`` items.
+    """
+
+    def __init__(self, name, info, points):
+        self.name = name
+        self.info = info
+        self.points = points
+
+    @property
+    def group(self):
+        """ Group number (VSP component id). """
+        return int(self.info.get('GROUP NUMBER', -1))
+
+    @property
+    def symmetry(self):
+        """ Symmetry flag. """
+        return int(self.info.get('SYMMETRY FLAG', 0))
+
+
+def read_hermite(path):
+    """
+    Returns list of :class:`HermiteComponent` read from `path`. The file is
+    read line by line up to each block of points, which is converted in one
+    operation.
+    """
+    components = []
+    name = None
+    info = {}
+    with open(path, 'r') as inp:
+        for line in inp:
+            if '=' not in line:
+                if line.strip():  # Start of component (or file header).
+                    name = line.strip()
+                    info = {}
+                continue
+
+            key, value = line.split('=', 1)
+            key = ' '.join(key.split()).upper()
+            info[key] = value.strip()
+            counts = _counts(info)
+            if counts is None:
+                continue
+
+            try:
+                nsections, npoints = [int(count) for count in counts]
+            except ValueError:
+                raise ValueError('%s: bad header for component %r: %r'
+                                 % (path, name, info))
+            lines = list(itertools.islice(inp, nsections * npoints))
+            values = numpy.fromstring(''.join(lines), dtype=float, sep=' ')
+            if len(values) != nsections * npoints * 3:
+                raise ValueError('%s: expecting %d points for component %r,'
+                                 ' got %d values' % (path, nsections * npoints,
+                                                     name, len(values)))
+            components.append(
+                HermiteComponent(name, info,
+                                 values.reshape((nsections, npoints, 3))))
+            name = None
+            info = {}
+    return components
+
+
+def _counts(info):
+    """
+    Returns ``(sections, points)`` values from header `info`, or None if
+    either hasn't been read yet.
+    """
+    sections = points = None
+    for key, value in info.items():
+        if not key.startswith('NUMBER OF'):
+            continue
+        if key.startswith('NUMBER OF PTS'):
+            points = value
+        elif 'XSEC' in key or 'CROSS SECTION' in key:
+            sections = value
+    if sections is None or points is None:
+        return None
+    return (sections, points)
@@ -1,16 +1,39 @@
 import xml.etree.cElementTree as ElementTree
 
-from openmdao.lib.datatypes.api import Int
+import numpy
+from numpy import zeros
+
+from openmdao.lib.datatypes.api import Array, Float, Int
 
 from vsp_wrapper.component     import VSPComponent
 from vsp_wrapper.xml_container import XMLContainer
 
+# Triangle record: three vertices then the normal, as in <Tri> text.
+TRI_DTYPE = numpy.dtype([('vertices', float, (3, 3)), ('normal', float, 3)])
+
+# Format of one <Tri> text.
+_TRI_FORMAT = ', '.join(['%f'] * 12)
+
 
 class Mesh(VSPComponent):
-    """ Meshed geometry. """
+    """
+    Meshed geometry. Surface area, enclosed volume, centroid, and bounding
+    box are evaluated from the triangles whenever they are read or set.
+    """
 
     XMLTYPE = 'Mesh'
 
+    area = Float(0., iotype='out', desc='Surface area of mesh.')
+    volume = Float(0., iotype='out',
+                   desc='Volume enclosed by mesh (zero if not closed).')
+    centroid = Array(zeros(3), iotype='out', shape=(3,),
+                     desc='Centroid of enclosed volume, or of surface if'
+                          ' no volume is enclosed.')
+    bbox_min = Array(zeros(3), iotype='out', shape=(3,),
+                     desc='Minimum coordinates of mesh vertices.')
+    bbox_max = Array(zeros(3), iotype='out', shape=(3,),
+                     desc='Maximum coordinates of mesh vertices.')
+
     def __init__(self):
         super(Mesh, self).__init__()
         self.add('mesh_parms', MeshParms())
@@ -23,6 +46,12 @@ class Mesh(VSPComponent):
         if parms is None:
             self.raise_exception('No %s element!?' % MeshParms.XMLTAG)
         self.mesh_parms.read(parms)
+        self.update_properties()
+
+    def update_properties(self):
+        """ Evaluate mesh properties from current triangles. """
+        self.area, self.volume, self.centroid, self.bbox_min, self.bbox_max = \
+            mesh_properties(self.mesh_parms.get_tris())
 
     def write(self, parent, nesting=0):
         """
@@ -44,7 +73,31 @@ class MeshParms(XMLContainer):
 
     def __init__(self):
         super(MeshParms, self).__init__(self.XMLTAG)
-        self._tris = []
+        self._tris = numpy.zeros(0, TRI_DTYPE)
+
+    def get_tris(self):
+        """ Returns triangle array, of dtype :data:`TRI_DTYPE`. """
+        return self._tris
+
+    def set_tris(self, tris):
+        """ Set triangles from array of :data:`TRI_DTYPE` or (n, 12) array. """
+        tris = numpy.asarray(tris)
+        if tris.dtype != TRI_DTYPE:
+            tris = numpy.asarray(tris, dtype=float)
+            if tris.ndim != 2 or tris.shape[1] != 12:
+                self.raise_exception('Expecting (n, 12) array, got %s'
+                                     % (tris.shape,), ValueError)
+            tris = numpy.ascontiguousarray(tris).view(TRI_DTYPE).ravel()
+        self._tris = tris
+        self._invalidate_tree()
+        self.num_tris = len(tris)
+        if isinstance(self.parent, Mesh):
+            self.parent.update_properties()
+
+    def update_signature_data(self, sha):
+        """ Update hash object `sha` with triangle data. """
+        sha.update('\n_tris=%d' % len(self._tris))
+        sha.update(self._tris.tostring())
 
     def read(self, this):
         """ Read parameters from XML tree element `this`. """
@@ -53,9 +106,8 @@ class MeshParms(XMLContainer):
         tri_list = this.find('Tri_List')
         if tri_list is None:
             self.raise_exception('No Tri_List!?', RuntimeError)
-        tris = tri_list.findall('Tri')
-        for element in tris:
-            self._tris.append(element.text)
+        self._tris = _parse_tris([element.text or ''
+                                  for element in tri_list.findall('Tri')])
 
     def write(self, parent, nesting=0):
         """
@@ -68,12 +120,77 @@ class MeshParms(XMLContainer):
         tri_list.text = self.tail(nesting+2)
         tri_list.tail = self.tail(nesting+1)
         child_tail = self.tail(nesting+2)
-        for tri in self._tris:
+        for text in _format_tris(self._tris):
             child = ElementTree.Element('Tri')
-            child.text = tri
+            child.text = text
             child.tail = child_tail
             tri_list.append(child)
         this.append(tri_list)
 
         return this
 
+
+def mesh_properties(tris):
+    """
+    Returns ``(area, volume, centroid, bbox_min, bbox_max)`` for triangle
+    array `tris`, see :func:`triangle_properties`.
+    """
+    return triangle_properties(tris['vertices'])
+
+
+def triangle_properties(vertices):
+    """
+    Returns ``(area, volume, centroid, bbox_min, bbox_max)`` for (n, 3, 3)
+    array of triangle `vertices`. Volume is from the divergence theorem,
+    the sum of signed volumes of tetrahedra formed by each triangle and the
+    origin, so it is only meaningful for a closed surface. Its sign is
+    dropped, triangles may be wound either way. If there is no enclosed
+    volume the centroid is the area-weighted centroid of the surface.
+    """
+    if not len(vertices):
+        return (0., 0., zeros(3), zeros(3), zeros(3))
+
+    a = vertices[:, 0]
+    b = vertices[:, 1]
+    c = vertices[:, 2]
+    cross = numpy.cross(b - a, c - a)
+    areas = 0.5 * numpy.sqrt((cross * cross).sum(axis=1))
+    area = areas.sum()
+
+    # Tetrahedron volumes: a . (b x c) / 6, centroids (a + b + c) / 4.
+    volumes = (a * numpy.cross(b, c)).sum(axis=1) / 6.
+    volume = volumes.sum()
+    centers = a + b + c
+    if abs(volume) > 1e-12 * max(area, 1.) ** 1.5:
+        centroid = (volumes[:, None] * centers).sum(axis=0) / (4. * volume)
+    elif area > 0.:
+        volume = 0.
+        centroid = (areas[:, None] * centers).sum(axis=0) / (3. * area)
+    else:
+        volume = 0.
+        centroid = centers.mean(axis=0) / 3.
+
+    points = vertices.reshape((-1, 3))
+    return (float(area), abs(float(volume)), centroid,
+            points.min(axis=0), points.max(axis=0))
+
+
+def _parse_tris(texts):
+    """ Returns triangle array for list of <Tri> texts. """
+    if not texts:
+        return numpy.zeros(0, TRI_DTYPE)
+    # Parsing stops at the first bad value, caught by the length check.
+    values = numpy.fromstring(','.join(texts), dtype=float, sep=',')
+    if len(values) != len(texts) * 12:
+        raise ValueError('Expecting 12 values per Tri, got %d for %d'
+                         % (len(values), len(texts)))
+    return values.view(TRI_DTYPE)
+
+
+def _format_tris(tris):
+    """ Returns list of <Tri> texts for triangle array. """
+    if not len(tris):
+        return []
+    values = tuple(tris.view(float).ravel())
+    return ('\n'.join([_TRI_FORMAT] * len(tris)) % values).split('\n')
+
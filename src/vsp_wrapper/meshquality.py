@@ -0,0 +1,90 @@
+"""
+Quality statistics of triangle meshes.
+
+Aspect ratio is ``longest_edge * perimeter / (4 * sqrt(3) * area)``, one
+for an equilateral triangle. Skewness is the equiangular skew
+``max((max_angle - 60) / 120, (60 - min_angle) / 60)``, zero for an
+equilateral triangle and one for a degenerate one. An edge used by one
+triangle is a boundary edge, one used by more than two is non-manifold; a
+mesh with neither is watertight.
+"""
+
+import numpy
+
+# Histogram bin edges.
+ASPECT_BINS = numpy.array([1., 1.5, 2., 3., 5., 10., numpy.inf])
+SKEWNESS_BINS = numpy.array([0., 0.25, 0.5, 0.75, 0.9, 1.])
+
+
+class MeshQuality(object):
+    """ Quality statistics of a triangle mesh, see :func:`mesh_quality`. """
+
+    def __init__(self):
+        self.num_tris = 0
+        self.edge_min = 0.
+        self.edge_max = 0.
+        self.edge_mean = 0.
+        self.aspect_max = 0.
+        self.aspect_hist = numpy.zeros(len(ASPECT_BINS) - 1, dtype=int)
+        self.skewness_max = 0.
+        self.skewness_hist = numpy.zeros(len(SKEWNESS_BINS) - 1, dtype=int)
+        self.boundary_edges = 0
+        self.nonmanifold_edges = 0
+
+    @property
+    def watertight(self):
+        """ True if every edge is shared by exactly two triangles. """
+        return self.boundary_edges == 0 and self.nonmanifold_edges == 0
+
+
+def mesh_quality(vertices, faces):
+    """
+    Returns :class:`MeshQuality` for triangles `faces` ((n, 3) vertex
+    indices) of `vertices` ((m, 3) coordinates).
+    """
+    quality = MeshQuality()
+    quality.num_tris = len(faces)
+    if not len(faces):
+        return quality
+
+    corners = vertices[faces]
+    sides = corners[:, [1, 2, 0]] - corners  # Side i is opposite corner i-1.
+    lengths = numpy.sqrt((sides * sides).sum(axis=2))
+    quality.edge_min = float(lengths.min())
+    quality.edge_max = float(lengths.max())
+    quality.edge_mean = float(lengths.mean())
+
+    cross = numpy.cross(sides[:, 0], sides[:, 1])
+    area = 0.5 * numpy.sqrt((cross * cross).sum(axis=1))
+    degenerate = area <= 0.
+    area[degenerate] = 1.
+    aspect = lengths.max(axis=1) * lengths.sum(axis=1) \
+             / (4. * numpy.sqrt(3.) * area)
+    aspect[degenerate] = numpy.inf
+    quality.aspect_max = float(aspect.max())
+    quality.aspect_hist = numpy.histogram(aspect, ASPECT_BINS)[0]
+
+    # Corner angles from the sides meeting there.
+    a = lengths[:, 0]
+    b = lengths[:, 1]
+    c = lengths[:, 2]
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        cosines = numpy.array([(c*c + a*a - b*b) / (2.*c*a),
+                               (a*a + b*b - c*c) / (2.*a*b),
+                               (b*b + c*c - a*a) / (2.*b*c)])
+    angles = numpy.degrees(numpy.arccos(numpy.clip(cosines, -1., 1.)))
+    skewness = numpy.maximum((angles.max(axis=0) - 60.) / 120.,
+                             (60. - angles.min(axis=0)) / 60.)
+    skewness[degenerate | numpy.isnan(skewness)] = 1.
+    quality.skewness_max = float(skewness.max())
+    quality.skewness_hist = numpy.histogram(skewness, SKEWNESS_BINS)[0]
+
+    # Count uses of each edge, keyed by its sorted vertex indices.
+    ends = numpy.sort(faces[:, [0, 1, 1, 2, 2, 0]].reshape((-1, 2)), axis=1)
+    keys = numpy.sort(ends[:, 0].astype(numpy.int64) * len(vertices) +
+                      ends[:, 1])
+    starts = numpy.flatnonzero(numpy.r_[True, keys[1:] != keys[:-1]])
+    uses = numpy.diff(numpy.r_[starts, len(keys)])
+    quality.boundary_edges = int((uses == 1).sum())
+    quality.nonmanifold_edges = int((uses > 2).sum())
+    return quality
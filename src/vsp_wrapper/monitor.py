@@ -0,0 +1,166 @@
+"""
+Watch VSP output while VSP is running.
+
+A :class:`LogMonitor` reads lines as they are appended to the VSP log file
+and passes them to a list of matchers. A matcher may request that VSP be
+aborted, for instance when a fatal error message appears or a CFD mesh run
+exceeds its triangle or time budget. Once VSP is done, matchers may report
+an error, such as a required message that never appeared.
+"""
+
+import io
+import os
+import re
+
+
+class LogMatcher(object):
+    """
+    Base class for log matchers. Methods return None to continue, or a
+    message describing why VSP should be aborted (or the run rejected).
+    """
+
+    def line(self, text):
+        """ Called with each line of output. """
+        return None
+
+    def tick(self, elapsed):
+        """ Called periodically with seconds since VSP was started. """
+        return None
+
+    def finish(self):
+        """ Called once all output has been processed. """
+        return None
+
+
+class PatternMatcher(LogMatcher):
+    """
+    Matches regular expression `pattern`. If `fatal`, VSP is aborted when the
+    pattern is found, otherwise matching lines are logged as warnings to
+    `logger` (if not None).
+    """
+
+    def __init__(self, pattern, fatal=False, logger=None):
+        self.regex = re.compile(pattern)
+        self.fatal = fatal
+        self.logger = logger
+
+    def line(self, text):
+        if self.regex.search(text):
+            if self.fatal:
+                return 'found %r' % text
+            if self.logger is not None:
+                self.logger.warning(text)
+        return None
+
+
+class RequiredMatcher(LogMatcher):
+    """ Reports `message` if regular expression `pattern` never matched. """
+
+    def __init__(self, pattern, message):
+        self.regex = re.compile(pattern)
+        self.message = message
+        self.found = False
+
+    def line(self, text):
+        if not self.found and self.regex.search(text):
+            self.found = True
+        return None
+
+    def finish(self):
+        return None if self.found else self.message
+
+
+class TriangleBudget(LogMatcher):
+    """
+    Aborts if VSP reports more than `max_tris` triangles
+    (a line containing 'Num Tris' followed by a count).
+    """
+
+    _REGEX = re.compile(r'Num Tris\D*(\d+)')
+
+    def __init__(self, max_tris):
+        self.max_tris = max_tris
+
+    def line(self, text):
+        match = self._REGEX.search(text)
+        if match is not None and int(match.group(1)) > self.max_tris:
+            return 'triangle count %s exceeds %d' \
+                   % (match.group(1), self.max_tris)
+        return None
+
+
+class TimeBudget(LogMatcher):
+    """ Aborts if VSP has been running for more than `max_time` seconds. """
+
+    def __init__(self, max_time):
+        self.max_time = max_time
+
+    def tick(self, elapsed):
+        if elapsed > self.max_time:
+            return 'run time %.1f exceeds %g seconds' \
+                   % (elapsed, self.max_time)
+        return None
+
+
+class LogMonitor(object):
+    """ Passes lines appended to `filename` to `matchers`. """
+
+    def __init__(self, filename, matchers):
+        self.filename = filename
+        self.matchers = list(matchers)
+        self._file = None
+        self._partial = ''
+
+    def poll(self, elapsed=0.):
+        """
+        Process any new output. Returns reason to abort VSP, or None.
+        """
+        for text in self._read_lines():
+            for matcher in self.matchers:
+                reason = matcher.line(text)
+                if reason:
+                    return reason
+        for matcher in self.matchers:
+            reason = matcher.tick(elapsed)
+            if reason:
+                return reason
+        return None
+
+    def finish(self):
+        """
+        Process remaining output once VSP is done.
+        Returns reason to reject the results, or None.
+        """
+        try:
+            for text in self._read_lines(final=True):
+                for matcher in self.matchers:
+                    reason = matcher.line(text)
+                    if reason:
+                        return reason
+            for matcher in self.matchers:
+                reason = matcher.finish()
+                if reason:
+                    return reason
+            return None
+        finally:
+            self.close()
+
+    def close(self):
+        """ Close log file. """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _read_lines(self, final=False):
+        """ Return list of complete lines appended since last call. """
+        if self._file is None:
+            if not os.path.exists(self.filename):
+                return []
+            self._file = io.open(self.filename, 'rb')
+        data = self._partial + self._file.read()
+        lines = data.split('\n')
+        if final:
+            self._partial = ''
+        else:
+            self._partial = lines.pop()  # Possibly incomplete.
+        return [line.rstrip('\r') for line in lines if line]
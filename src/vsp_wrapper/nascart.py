@@ -0,0 +1,75 @@
+"""
+Read NASCART ``bodyin.dat`` and ``bodyin.key`` files.
+
+``bodyin.dat`` starts with a line giving the number of nodes and of
+triangles, followed by ``x y z`` for each node, then ``i j k tag`` for each
+triangle, with one-based node indices and a component tag (which may be
+written as a float). ``bodyin.key`` lists ``tag name ...`` lines relating
+tags to component names; comment lines (``#``) and lines not starting with
+an integer tag followed by a name are ignored. This layout has not yet been
+checked against files written by VSP.
+"""
+
+import numpy
+
+
+class NascartMesh(object):
+    """
+    NASCART surface mesh: `nodes` (n, 3) float array, `tris` (m, 3)
+    zero-based node indices, `tags` (m,) component tag of each triangle,
+    and `names`, a dictionary mapping tag to component name.
+    """
+
+    def __init__(self, nodes, tris, tags, names):
+        self.nodes = nodes
+        self.tris = tris
+        self.tags = tags
+        self.names = names
+
+    def component_tris(self, name):
+        """ Returns triangles of component `name`. """
+        tags = [tag for tag, tag_name in self.names.items()
+                if tag_name == name]
+        if not tags:
+            raise KeyError('%r is not a component of this mesh' % name)
+        return self.tris[numpy.in1d(self.tags, tags)]
+
+
+def read_nascart(dat_path='bodyin.dat', key_path='bodyin.key'):
+    """
+    Returns :class:`NascartMesh` from `dat_path` and `key_path`
+    (component names are empty if `key_path` is None).
+    """
+    with open(dat_path, 'r') as inp:
+        header = inp.readline().split()
+        try:
+            nnodes, ntris = int(header[0]), int(header[1])
+        except (IndexError, ValueError):
+            raise ValueError('%s: bad header %r' % (dat_path, header))
+        values = numpy.fromstring(inp.read(), dtype=float, sep=' ')
+
+    nvalues = len(values) - nnodes * 3
+    if nvalues < 0 or nvalues != ntris * 4:
+        raise ValueError('%s: expecting %d nodes and %d tagged triangles,'
+                         ' got %d values' % (dat_path, nnodes, ntris,
+                                             len(values)))
+    nodes = values[:nnodes*3].reshape((nnodes, 3))
+    rows = values[nnodes*3:].reshape((ntris, 4))
+    tris = rows[:, :3].astype(int) - 1
+    tags = rows[:, 3].astype(int)
+    if len(tris) and (tris.min() < 0 or tris.max() >= nnodes):
+        raise ValueError('%s: node index out of range' % dat_path)
+
+    names = {}
+    if key_path is not None:
+        with open(key_path, 'r') as inp:
+            for line in inp:
+                fields = line.split()
+                if len(fields) < 2 or fields[0].startswith('#'):
+                    continue
+                try:
+                    tag = int(fields[0])
+                except ValueError:
+                    continue
+                names[tag] = fields[1]
+    return NascartMesh(nodes, tris, tags, names)
@@ -51,6 +51,7 @@ class VSPParametricGeometry(object):
     def list_parameters(self):
         params = []
         if self._vsp is not None:
+            self._vsp.geometry.materialize_all()
             for key, val in self._vsp.items(iotype=not_none, recurse=True):
                 if key in self._excludes:
                     continue
@@ -0,0 +1,86 @@
+"""
+Read VSP area slicing (``-slice``) results and derive area-rule quantities.
+
+The results file ``<base>_Slice.txt`` is assumed to hold one block of rows
+per Mach cone roll angle; this name and layout have not been checked
+against VSP output. A block starts with a line ``Theta = <angle>``
+(degrees) and is followed by one ``x area`` row per slice station, values
+separated by whitespace or commas. Other non-numeric lines are ignored.
+A file without ``Theta`` lines is a single block at angle zero (normal
+slices). All blocks must have the same number of stations.
+"""
+
+import re
+
+import numpy
+
+_ANGLE = re.compile(r'theta\s*=\s*([-+.\dEe]+)', re.I)
+
+
+def read_slices(path):
+    """
+    Returns ``(angles, x, area)`` from slice results `path`: `angles` is a
+    (nangles,) array, `x` and `area` are (nangles, nslices) arrays.
+    """
+    angles = []
+    blocks = []
+    rows = None
+    with open(path, 'r') as inp:
+        for line in inp:
+            fields = line.replace(',', ' ').split()
+            if not fields:
+                continue
+            match = _ANGLE.search(line)
+            if match:
+                angles.append(float(match.group(1)))
+                rows = []
+                blocks.append(rows)
+                continue
+            try:
+                values = [float(field) for field in fields]
+            except ValueError:
+                continue  # Header or other text.
+            if len(values) != 2:
+                raise ValueError('%s: expecting x and area, got %r'
+                                 % (path, line))
+            if rows is None:  # No angle lines.
+                angles.append(0.)
+                rows = []
+                blocks.append(rows)
+            rows.append(values)
+
+    if not blocks:
+        raise ValueError('%s: no slice data' % path)
+    lengths = set([len(block) for block in blocks])
+    if len(lengths) != 1:
+        raise ValueError('%s: blocks have differing station counts %s'
+                         % (path, sorted(lengths)))
+    data = numpy.array(blocks, dtype=float)
+    return (numpy.array(angles), data[:, :, 0], data[:, :, 1])
+
+
+def second_derivative(x, y):
+    """
+    Returns second derivative of `y` with respect to `x` along the last
+    axis at interior points, for possibly nonuniform stations.
+    """
+    h0 = x[..., 1:-1] - x[..., :-2]
+    h1 = x[..., 2:] - x[..., 1:-1]
+    return 2. * (h0 * y[..., 2:] - (h0 + h1) * y[..., 1:-1] + h1 * y[..., :-2]) \
+           / (h0 * h1 * (h0 + h1))
+
+
+def area_rule(x, area):
+    """
+    Returns ``(max_area, smoothness, d2_max)`` per angle for slice arrays
+    `x` and `area`. `smoothness` is the integral of the squared second
+    derivative of area over the interior stations (smaller is smoother),
+    `d2_max` the largest magnitude of the second derivative.
+    """
+    max_area = area.max(axis=-1)
+    if x.shape[-1] < 3:
+        zero = numpy.zeros(x.shape[:-1])
+        return (max_area, zero, zero)
+    d2 = second_derivative(x, area)
+    smoothness = numpy.trapz(d2 * d2, x[..., 1:-1], axis=-1)
+    return (max_area, smoothness, abs(d2).max(axis=-1))
@@ -0,0 +1,85 @@
+"""
+Binary snapshots of parsed geometries.
+
+A snapshot is a pickled :class:`VSPGeometry`, preceded by a header line
+holding the snapshot format and a hash of the XML file it was read from.
+Components not yet read are saved as their XML text and are still read
+lazily after loading. A snapshot whose hash doesn't match the current XML
+file content is stale and ignored, to be replaced by a new one.
+Snapshots are written to a temporary file and then renamed, so several
+processes may load and save snapshots of the same model concurrently.
+"""
+
+import cPickle
+import errno
+import hashlib
+import os
+import tempfile
+
+# Change whenever pickled geometry contents change.
+FORMAT = 'vsp_wrapper-snapshot-1'
+
+
+def snapshot_path(xml_filename, directory=None):
+    """
+    Returns path to snapshot of `xml_filename`, in `directory` if specified,
+    otherwise next to `xml_filename`.
+    """
+    xml_filename = os.path.abspath(xml_filename)
+    if directory:
+        # Include a hash of the path, models in different directories may
+        # have the same name.
+        name = '%s-%s.snapshot' \
+               % (os.path.basename(xml_filename),
+                  hashlib.sha1(xml_filename).hexdigest()[:12])
+        return os.path.join(os.path.abspath(directory), name)
+    return xml_filename + '.snapshot'
+
+
+def _header(xml_filename):
+    """ Returns header line for snapshot of `xml_filename`. """
+    sha = hashlib.sha1()
+    with open(xml_filename, 'rb') as inp:
+        sha.update(inp.read())
+    return '%s %s\n' % (FORMAT, sha.hexdigest())
+
+
+def load_snapshot(xml_filename, directory=None):
+    """
+    Returns geometry from snapshot of `xml_filename`, or None if there is no
+    current snapshot.
+    """
+    path = snapshot_path(xml_filename, directory)
+    try:
+        with open(path, 'rb') as inp:
+            if inp.readline() != _header(xml_filename):
+                return None  # Stale.
+            return cPickle.load(inp)
+    except Exception:  # Missing, truncated, or classes have changed.
+        return None
+
+
+def save_snapshot(geometry, xml_filename, directory=None):
+    """ Save snapshot of `geometry` read from `xml_filename`. """
+    path = snapshot_path(xml_filename, directory)
+    dirname = os.path.dirname(path)
+    try:
+        os.makedirs(dirname)
+    except OSError as exc:
+        if exc.errno != errno.EEXIST:
+            raise
+
+    fd, tmp = tempfile.mkstemp(prefix='.tmp-', dir=dirname)
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            out.write(_header(xml_filename))
+            cPickle.dump(geometry, out, 2)
+        try:
+            os.rename(tmp, path)
+        except OSError:  # Windows won't rename onto an existing file.
+            os.remove(path)
+            os.rename(tmp, path)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
@@ -12,6 +12,7 @@ class BaseSource(XMLContainer):
     """ Base class for CFD meshing source objects. """
 
     XMLTAG = 'CFD_Mesh_Source'
+    AFFECTS = 'cfd_mesh'
 
     source_name = Str('Default_Name', iotype='in', xmltag='Name',
                       desc='Name of this source.')
@@ -0,0 +1,206 @@
+"""
+Read STL files into shared vertex and face arrays.
+
+Binary files are memory-mapped, ASCII files are parsed in chunks of lines,
+with vertex coordinates extracted by regular expression and converted by
+NumPy. Coincident vertices are then welded, so each triangle refers to
+shared vertices by index.
+
+ASCII files may contain several solids, such as one per component; their
+names and the index of each solid's first face are kept. A binary
+file is a single solid named by its header.
+"""
+
+import os
+import re
+
+import numpy
+
+from vsp_wrapper.mesh import triangle_properties
+
+# Binary STL triangle record.
+_BINARY_DTYPE = numpy.dtype([('normal', '<f4', 3), ('vertices', '<f4', (3, 3)),
+                             ('attribute', '<u2')])
+
+_SOLID = re.compile(r'^[ \t]*solid\b[ \t]*(.*?)[ \t\r]*$', re.M)
+_VERTEX = re.compile(r'vertex[ \t]+([^\r\n]*)')
+
+
+class STLMesh(object):
+    """
+    Triangle mesh read from an STL file. `vertices` is an (m, 3) float
+    array, `faces` an (n, 3) integer array of vertex indices. `names` and
+    `starts` give the name and first face index of each solid.
+    """
+
+    def __init__(self, vertices, faces, names, starts):
+        self.vertices = vertices
+        self.faces = faces
+        self.names = names
+        self.starts = starts
+
+    def __len__(self):
+        return len(self.faces)
+
+    def solid_faces(self, name):
+        """ Returns faces of (first) solid `name`. """
+        try:
+            i = self.names.index(name)
+        except ValueError:
+            raise KeyError('%r is not a solid of this mesh' % name)
+        return self.faces[slice(*self.solid_range(i))]
+
+    def solid_range(self, i):
+        """ Returns ``(start, end)`` face indices of solid number `i`. """
+        end = self.starts[i+1] if i+1 < len(self.starts) else len(self.faces)
+        return (self.starts[i], end)
+
+    def triangles(self, faces=None):
+        """ Returns (n, 3, 3) array of triangle vertices for `faces`. """
+        if faces is None:
+            faces = self.faces
+        return self.vertices[faces]
+
+
+def solid_properties(mesh):
+    """
+    Returns structured array of properties of each solid in `mesh`:
+    `name`, `area`, `volume`, `centroid`, `bbox_min`, and `bbox_max`, as
+    computed by :func:`triangle_properties`.
+    """
+    width = max([len(name) for name in mesh.names] + [1])
+    table = numpy.zeros(len(mesh.names),
+                        dtype=[('name', 'S%d' % width), ('area', float),
+                               ('volume', float), ('centroid', float, 3),
+                               ('bbox_min', float, 3), ('bbox_max', float, 3)])
+    for i, name in enumerate(mesh.names):
+        area, volume, centroid, bbox_min, bbox_max = \
+            triangle_properties(
+                mesh.triangles(mesh.faces[slice(*mesh.solid_range(i))]))
+        table[i] = (name, area, volume, centroid, bbox_min, bbox_max)
+    return table
+
+
+def read_stl(path, tolerance=0., chunk_size=1 << 24):
+    """
+    Returns :class:`STLMesh` read from `path`. Vertices are welded if
+    they are identical, or within `tolerance` if it is nonzero. ASCII files
+    are read `chunk_size` bytes at a time.
+    """
+    if _is_binary(path):
+        names, starts, points = _read_binary(path)
+    else:
+        names, starts, points = _read_ascii(path, chunk_size)
+    vertices, faces = weld(points, tolerance)
+    return STLMesh(vertices, faces, names, numpy.array(starts, dtype=int))
+
+
+def _is_binary(path):
+    """ Returns True if `path` is a binary STL file. """
+    size = os.path.getsize(path)
+    if size < 84:
+        return False
+    with open(path, 'rb') as inp:
+        header = inp.read(84)
+    count = numpy.fromstring(header[80:84], dtype='<u4')[0]
+    # ASCII files start with 'solid', but so do some binary headers.
+    return size == 84 + count * _BINARY_DTYPE.itemsize
+
+
+def _read_binary(path):
+    """ Returns ``(names, starts, points)`` from binary STL `path`. """
+    with open(path, 'rb') as inp:
+        header = inp.read(80)
+    name = header.split('\0', 1)[0].strip()
+    if name.startswith('solid'):
+        name = name[5:].strip()
+
+    records = numpy.memmap(path, dtype=_BINARY_DTYPE, mode='r', offset=84)
+    try:
+        points = numpy.array(records['vertices'], dtype=float).reshape((-1, 3))
+    finally:
+        del records  # Release the mapping.
+    return ([name], [0], points)
+
+
+def _read_ascii(path, chunk_size):
+    """ Returns ``(names, starts, points)`` from ASCII STL `path`. """
+    names = []
+    starts = []
+    arrays = []
+    nvertices = 0
+    rest = ''
+    with open(path, 'rb') as inp:
+        while True:
+            data = inp.read(chunk_size)
+            if data:
+                # Only parse whole lines.
+                data = rest + data
+                end = data.rfind('\n') + 1
+                rest = data[end:]
+                data = data[:end]
+            else:
+                data = rest
+                rest = None
+
+            # Split into text of current solid, then (name, text) pairs.
+            pieces = _SOLID.split(data)
+            for i, text in enumerate(pieces):
+                if i % 2:
+                    names.append(text)
+                    starts.append(nvertices // 3)
+                    continue
+                coords = _VERTEX.findall(text)
+                if coords:
+                    values = numpy.fromstring(' '.join(coords), dtype=float,
+                                              sep=' ')
+                    if len(values) != len(coords) * 3:
+                        raise ValueError('%s: bad vertex in %r'
+                                         % (path, coords[:3]))
+                    arrays.append(values)
+                    nvertices += len(coords)
+            if rest is None:
+                break
+
+    if nvertices % 3:
+        raise ValueError('%s: %d vertices is not a whole number of'
+                         ' triangles' % (path, nvertices))
+    if not names:
+        names, starts = [''], [0]
+    if arrays:
+        points = numpy.concatenate(arrays).reshape((-1, 3))
+    else:
+        points = numpy.zeros((0, 3))
+    return (names, starts, points)
+
+
+def weld(points, tolerance=0.):
+    """
+    Returns ``(vertices, faces)`` for (3n, 3) array of triangle corner
+    `points`. Identical points (or those within `tolerance` when quantized
+    to a grid of that spacing) become one vertex, in order of first use.
+    """
+    if not len(points):
+        return (numpy.zeros((0, 3)), numpy.zeros((0, 3), dtype=int))
+    if tolerance:
+        keys = numpy.round(points / tolerance)
+    else:
+        keys = points
+
+    # Sort so equal keys are adjacent, in original order (lexsort is
+    # stable), then number the runs of equal keys.
+    order = numpy.lexsort((keys[:, 2], keys[:, 1], keys[:, 0]))
+    ordered = keys[order]
+    new = numpy.empty(len(order), dtype=bool)
+    new[0] = True
+    new[1:] = (ordered[1:] != ordered[:-1]).any(axis=1)
+    first = order[new]  # First use of each vertex.
+    run = numpy.cumsum(new) - 1
+
+    # Renumber vertices in order of first use.
+    by_use = numpy.argsort(first)
+    renumber = numpy.empty(len(first), dtype=int)
+    renumber[by_use] = numpy.arange(len(first))
+    indices = numpy.empty(len(order), dtype=int)
+    indices[order] = renumber[run]
+    return (points[first[by_use]], indices.reshape((-1, 3)))
@@ -0,0 +1,68 @@
+"""
+Time component precedence ordering on synthetic models.
+
+Usage: python benchmark_precedence.py [max_components]
+
+Models of 10, 100, ... up to `max_components` (default 10000) Blank
+components are generated, with random nesting up to several levels deep and
+components listed in random order, so children often precede their parents.
+The time to read each model (components are read lazily, so this is mostly
+precedence ordering) is reported.
+"""
+
+import random
+import sys
+import time
+import xml.etree.cElementTree as ElementTree
+
+from vsp_wrapper.geometry import VSPGeometry
+
+
+def make_model(ncomponents, seed=0):
+    """ Returns root element of model with `ncomponents` components. """
+    rng = random.Random(seed)
+    root = ElementTree.Element('Vsp_Geometry')
+    windows = ElementTree.SubElement(root, 'VirtWindow_List')
+    ElementTree.SubElement(windows, 'VirtWindow')
+    component_list = ElementTree.SubElement(root, 'Component_List')
+
+    parents = []
+    for i in range(ncomponents):
+        ptr_id = str(i + 1)
+        if parents and rng.random() < 0.8:
+            parent_id = rng.choice(parents[-20:])
+        else:
+            parent_id = '0'
+        parents.append(ptr_id)
+
+        component = ElementTree.Element('Component')
+        ElementTree.SubElement(component, 'Type').text = 'Blank'
+        parms = ElementTree.SubElement(component, 'General_Parms')
+        ElementTree.SubElement(parms, 'Name').text = 'Blank_%d' % i
+        ElementTree.SubElement(parms, 'PtrID').text = ptr_id
+        ElementTree.SubElement(parms, 'Parent_PtrID').text = parent_id
+        component_list.append(component)
+
+    components = list(component_list)
+    rng.shuffle(components)
+    component_list[:] = components
+    return root
+
+
+def main(max_components=10000):
+    """ Time reading models of increasing size. """
+    print '%12s %10s' % ('components', 'read (s)')
+    ncomponents = 10
+    while ncomponents <= max_components:
+        root = make_model(ncomponents)
+        start = time.time()
+        geometry = VSPGeometry()
+        geometry.read(root)
+        elapsed = time.time() - start
+        assert len(geometry.list_components()) == ncomponents
+        print '%12d %10.4f' % (ncomponents, elapsed)
+        ncomponents *= 10
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -0,0 +1,77 @@
+"""
+Time reading and writing of the bundled test models.
+
+Usage: python benchmark_xml.py [repeat]
+
+Each model's XML is parsed once, then the time to read parameters into a new
+:class:`VSPGeometry` and to write them back out is reported (best of `repeat`
+trials), along with the number of XML containers in the model. 'lazy' is the
+time to read without reading any components, 'read' includes reading all
+components. 'text' is the time for :meth:`XMLContainer.write_text` once its
+template has been compiled. A final row totals all models.
+
+To measure a change, run this with the same `repeat` in a checkout from
+before and after it, for example::
+
+    git stash; python benchmark_xml.py 10; git stash pop
+    python benchmark_xml.py 10
+"""
+
+import glob
+import os
+import sys
+import time
+import xml.etree.cElementTree as ElementTree
+
+from vsp_wrapper.geometry import VSPGeometry
+
+
+def best_time(func, repeat):
+    """ Return best time in seconds of `repeat` calls to `func`. """
+    best = None
+    for i in range(repeat):
+        start = time.time()
+        func()
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def main(repeat=5):
+    """ Time each bundled test model. """
+    directory = os.path.dirname(os.path.abspath(__file__))
+    print '%-20s %10s %10s %10s %10s %10s' \
+          % ('model', 'containers', 'lazy (s)', 'read (s)', 'write (s)',
+             'text (s)')
+    totals = [0, 0., 0., 0., 0.]
+    for path in sorted(glob.glob(os.path.join(directory, '*.xml'))):
+        root = ElementTree.parse(path).getroot()
+
+        def lazy_read():
+            geometry = VSPGeometry()
+            geometry.read(root)
+            return geometry
+
+        def read():
+            geometry = lazy_read()
+            geometry.materialize_all()
+            return geometry
+
+        geometry = read()
+        ncontainers = len(list(geometry.xml_containers()))
+        lazy_time = best_time(lazy_read, repeat)
+        read_time = best_time(read, repeat)
+        write_time = best_time(lambda: geometry.write(None), repeat)
+        geometry.write_text()
+        text_time = best_time(geometry.write_text, repeat)
+        row = (ncontainers, lazy_time, read_time, write_time, text_time)
+        print '%-20s %10d %10.4f %10.4f %10.4f %10.4f' \
+              % ((os.path.basename(path),) + row)
+        totals = [total + value for total, value in zip(totals, row)]
+    print '%-20s %10d %10.4f %10.4f %10.4f %10.4f' \
+          % tuple(['total'] + totals)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -3,15 +3,18 @@ import logging
 import nose
 import os
 import pkg_resources
+import shutil
 import sys
+import tempfile
 import unittest
+import xml.etree.cElementTree as ElementTree
 
 from openmdao.main.api import set_as_top
 from openmdao.util.fileutil import find_in_path
 from openmdao.util.testutil import assert_raises, assert_rel_error
 from openmdao.main.component import SimulationRoot
 
-from vsp_wrapper import VSP
+from vsp_wrapper import VSP, VSPBatch
 
 ORIG_DIR = os.getcwd()
 VSP_PATH = 'vsp'
@@ -88,6 +91,62 @@ class TestCase(unittest.TestCase):
         assert_rel_error(self, vsp.wetted_area, 713.083095, 0.0005)
         assert_rel_error(self, vsp.wetted_volume, 287.489547, 0.002)
 
+        # Per-part table, wetted areas sum to the total.
+        table = vsp.comp_geom_table
+        self.assertTrue(len(table) > 0)
+        assert_rel_error(self, table['wetted_area'].sum(), vsp.wetted_area,
+                         0.001)
+        name = table['name'][0]
+        self.assertTrue(all(vsp.get_comp_geom(name)['name'] == name))
+        self.assertRaises(KeyError, vsp.get_comp_geom, 'no such part')
+
+        # Cross sections, one set per component.
+        self.assertTrue(len(vsp.xsec_components) > 0)
+        for comp in vsp.xsec_components:
+            self.assertEqual(comp.points.ndim, 3)
+            self.assertEqual(comp.points.shape[2], 3)
+
+        # NASCART mesh, tagged by component.
+        mesh = vsp.nascart_mesh
+        self.assertTrue(len(mesh.tris) > 0)
+        self.assertTrue(mesh.tris.max() < len(mesh.nodes))
+        self.assertTrue(mesh.names)
+
+        # Stereolith mesh, vertices shared between triangles.
+        mesh = vsp.stl_mesh
+        self.assertTrue(len(mesh) > 0)
+        self.assertTrue(len(mesh.vertices) < 3 * len(mesh))
+        self.assertEqual(mesh.faces.max(), len(mesh.vertices) - 1)
+
+    def test_stereo_analysis(self):
+        logging.debug('')
+        logging.debug('test_stereo_analysis')
+
+        # Reference values from CompGeom on the same model.
+        vsp = set_as_top(VSP('Cessna182.xml'))
+        vsp.vsp_path = VSP_PATH
+        vsp.comp_geom = True
+        vsp.run()
+        comp_geom_area = vsp.theoretical_area
+        comp_geom_volume = vsp.theoretical_volume
+
+        vsp.stereo_analysis = True
+        vsp.run()
+        self.assertFalse('-compgeom' in vsp.command)
+
+        # Same tessellation as CompGeom, but STL coordinates are written
+        # with limited precision.
+        assert_rel_error(self, vsp.theoretical_area, comp_geom_area, 0.01)
+        assert_rel_error(self, vsp.theoretical_volume, comp_geom_volume,
+                         0.02)
+        self.assertEqual(vsp.wetted_area, 0)
+
+        table = vsp.stl_table
+        self.assertTrue(len(table) > 0)
+        assert_rel_error(self, table['area'].sum(), vsp.theoretical_area,
+                         1e-9)
+        self.assertTrue((table['bbox_min'] <= table['bbox_max']).all())
+
     def test_eagle_eye(self):
         logging.debug('')
         logging.debug('test_eagle_eye')
@@ -203,6 +262,77 @@ class TestCase(unittest.TestCase):
         assert_rel_error(self, vsp.wetted_area, 0, 0.0001)
         assert_rel_error(self, vsp.wetted_volume, 0, 0.0001)
 
+    def test_cache(self):
+        logging.debug('')
+        logging.debug('test_cache')
+
+        cache_dir = tempfile.mkdtemp()
+        try:
+            vsp = set_as_top(VSP('hwb.xml'))
+            vsp.vsp_path = VSP_PATH
+            vsp.cache_dir = cache_dir
+            vsp.run()
+            self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+            # Same design point, results restored from cache.
+            os.remove('hwb.xml.new_CompGeom.csv')
+            vsp2 = set_as_top(VSP('hwb.xml'))
+            vsp2.vsp_path = VSP_PATH
+            vsp2.cache_dir = cache_dir
+            vsp2.run()
+            self.assertEqual(vsp2.theoretical_area, vsp.theoretical_area)
+            self.assertEqual(vsp2.wetted_volume, vsp.wetted_volume)
+            self.assertTrue(os.path.exists('hwb.xml.new_CompGeom.csv'))
+            self.assertEqual(len(os.listdir(cache_dir)), 1)
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_skip_cosmetic(self):
+        logging.debug('')
+        logging.debug('test_skip_cosmetic')
+
+        vsp = set_as_top(VSP('hwb.xml'))
+        vsp.vsp_path = VSP_PATH
+        vsp.run()
+        area = vsp.theoretical_area
+
+        # Display-only change, VSP not run.
+        os.remove('hwb.xml.new_CompGeom.csv')
+        name = vsp.geometry.list_components()[0]
+        comp = vsp.geometry.get(name)
+        comp.general_parms.color_r = 128.
+        vsp.run()
+        self.assertEqual(vsp.theoretical_area, area)
+        self.assertFalse(os.path.exists('hwb.xml.new_CompGeom.csv'))
+
+        # Geometry change, VSP run.
+        vsp.geometry.cg_x += 1.
+        vsp.run()
+        self.assertTrue(os.path.exists('hwb.xml.new_CompGeom.csv'))
+
+        # Can be disabled.
+        os.remove('hwb.xml.new_CompGeom.csv')
+        vsp.skip_cosmetic = False
+        vsp.run()
+        self.assertTrue(os.path.exists('hwb.xml.new_CompGeom.csv'))
+
+    def test_batch(self):
+        logging.debug('')
+        logging.debug('test_batch')
+
+        batch = VSPBatch('hwb.xml', processes=2,
+                         options={'vsp_path': VSP_PATH})
+        names = ['geometry.cg_x', 'geometry.cfd_mesh_base_length']
+        results = batch.run([[10., 0.5], [11., 0.5], [12., 0.4]], names)
+        self.assertFalse(results.failed.any())
+        assert_rel_error(self, results.outputs['theoretical_area'][0],
+                         647.158638, 0.0001)
+
+        results = batch.run([{'geometry.cg_x': 10.},
+                             {'geometry.no_such_parameter': 1.}])
+        self.assertEqual(list(results.failed), [False, True])
+        self.assertTrue(results.errors[1])
+
     def test_collision(self):
         logging.debug('')
         logging.debug('test_collision')
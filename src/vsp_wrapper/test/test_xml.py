@@ -0,0 +1,972 @@
+import glob
+import hashlib
+import logging
+import nose
+import os
+import pkg_resources
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+import xml.etree.cElementTree as ElementTree
+
+import numpy
+
+from openmdao.main.api import set_as_top
+from openmdao.lib.datatypes.api import Float
+from openmdao.main.component import SimulationRoot
+from openmdao.main.exceptions import RunStopped
+
+from vsp_wrapper import VSP, VSPBatch, run_concurrently
+from vsp_wrapper.cache import ResultCache
+from vsp_wrapper.compgeom import index_names, read_comp_geom
+from vsp_wrapper.geometry import VSPGeometry
+from vsp_wrapper.hermite import read_hermite
+from vsp_wrapper.hwb import HWB
+from vsp_wrapper.mesh import Mesh, TRI_DTYPE
+from vsp_wrapper.meshquality import mesh_quality
+from vsp_wrapper.monitor import LogMonitor, PatternMatcher, RequiredMatcher, \
+                                TimeBudget, TriangleBudget
+from vsp_wrapper.nascart import read_nascart
+from vsp_wrapper.slices import area_rule, read_slices
+from vsp_wrapper.snapshot import load_snapshot, save_snapshot, snapshot_path
+from vsp_wrapper.stl import read_stl, weld
+from vsp_wrapper.xml_container import XLATE
+
+
+class TestCase(unittest.TestCase):
+    """ Test XML reading and writing (VSP not required). """
+
+    directory = os.path.realpath(
+        pkg_resources.resource_filename('vsp_wrapper', 'test'))
+
+    # Stands in for VSP, writing CompGeom output after `delay` seconds.
+    FAKE_VSP = """\
+import sys
+import time
+
+time.sleep(%(delay)s)
+base = sys.argv[2]
+print 'Fake VSP', ' '.join(sys.argv[1:])
+with open(base + '_CompGeom.csv', 'w') as out:
+    out.write('Name, Theo_Area, Wet_Area, Theo_Vol, Wet_Vol\\n'
+              'Wing, 10.5, 9.0, 2.0, 1.5\\n'
+              'Totals, 10.5, 9.0, 2.0, 1.5\\n')
+with open(base + '_CompGeom.txt', 'w') as out:
+    out.write('Fake CompGeom\\n')
+"""
+
+    def fake_vsp(self, directory, delay=0):
+        """ Returns path to fake VSP executable written in `directory`. """
+        if sys.platform == 'win32':
+            raise nose.SkipTest('Fake VSP script requires a Unix shell.')
+        path = os.path.join(directory, 'fake_vsp')
+        with open(path, 'w') as out:
+            out.write('#!%s\n' % sys.executable)
+            out.write(self.FAKE_VSP % dict(delay=delay))
+        os.chmod(path, 0755)
+        return path
+
+    def read(self, path, lazy):
+        """ Return geometry read from `path`. """
+        geometry = VSPGeometry()
+        geometry.read(ElementTree.parse(path).getroot())
+        if not lazy:
+            geometry.materialize_all()
+        return geometry
+
+    def signature(self, geometry):
+        """ Return signature of `geometry`, ignoring display parameters. """
+        sha = hashlib.sha1()
+        geometry.update_signature(sha, ('display',))
+        return sha.hexdigest()
+
+    def test_signature(self):
+        logging.debug('')
+        logging.debug('test_signature')
+
+        path = os.path.join(self.directory, 'hwb.xml')
+        geometry = self.read(path, False)
+        components = [getattr(geometry, name)
+                      for name in geometry.list_components()]
+        hwb = [comp for comp in components if isinstance(comp, HWB)][0]
+        mesh = [comp for comp in components if isinstance(comp, Mesh)][0]
+        original = self.signature(geometry)
+
+        # Display parameters are ignored.
+        hwb.general_parms.color_r = (hwb.general_parms.color_r + 1) % 256
+        self.assertEqual(self.signature(geometry), original)
+
+        # Inputs without an xmltag.
+        hwb.sweep_deg_per_seg = [value + 1. for value in hwb.sweep_deg_per_seg]
+        changed = self.signature(geometry)
+        self.assertNotEqual(changed, original)
+
+        # Data not held in traits.
+        tris = mesh.mesh_parms.get_tris().copy()
+        tris['vertices'][0, 0, 0] += 1.
+        mesh.mesh_parms.set_tris(tris)
+        self.assertNotEqual(self.signature(geometry), changed)
+
+    def test_signature_files(self):
+        logging.debug('')
+        logging.debug('test_signature_files')
+
+        orig_dir = os.getcwd()
+        tmpdir = tempfile.mkdtemp()
+        try:
+            os.chdir(tmpdir)
+            SimulationRoot.chroot(tmpdir)
+
+            # Model referencing a texture file.
+            tree = ElementTree.parse(os.path.join(self.directory, 'hwb.xml'))
+            parms = tree.getroot().find('Component_List').find('Component') \
+                        .find('General_Parms')
+            texture = ElementTree.SubElement(parms, 'Applied_Texture')
+            ElementTree.SubElement(texture, 'Name').text = 'Logo'
+            ElementTree.SubElement(texture, 'Texture_Name').text = 'logo.tga'
+            tree.write('model.xml')
+            with open('logo.tga', 'wb') as out:
+                out.write('original')
+
+            vsp = set_as_top(VSP('model.xml'))
+            self.assertEqual(vsp.geometry.input_files(), ['logo.tga'])
+            signature = vsp._signature()
+            self.assertEqual(vsp._signature(), signature)
+
+            # Editing the file in place changes the signature.
+            with open('logo.tga', 'wb') as out:
+                out.write('modified')
+            self.assertNotEqual(vsp._signature(), signature)
+        finally:
+            os.chdir(orig_dir)
+            SimulationRoot.chroot(orig_dir)
+            shutil.rmtree(tmpdir)
+
+    def test_lazy_signature(self):
+        logging.debug('')
+        logging.debug('test_lazy_signature')
+
+        # Same signature whether or not components have been read.
+        for path in sorted(glob.glob(os.path.join(self.directory, '*.xml'))):
+            logging.debug('    %s', os.path.basename(path))
+            geometry = self.read(path, True)
+            original = self.signature(geometry)
+            geometry.get(geometry.list_components()[0])
+            self.assertEqual(self.signature(geometry), original)
+            self.assertEqual(self.signature(self.read(path, False)), original)
+
+        # A change to an unread component's XML is noticed.
+        path = os.path.join(self.directory, '777.xml')
+        root = ElementTree.parse(path).getroot()
+        geometry = VSPGeometry()
+        geometry.read(root)
+        original = self.signature(geometry)
+        element = root.find('Component_List')[-1].find('General_Parms')
+        element.find('Tran_X').text = '1234.5'
+        geometry = VSPGeometry()
+        geometry.read(root)
+        self.assertNotEqual(self.signature(geometry), original)
+
+        # Clones reuse digests of the components they share.
+        geometry = self.read(path, True)
+        original = self.signature(geometry)
+        count = len(geometry._signatures)
+        clone = geometry.clone()
+        self.assertEqual(self.signature(clone), original)
+        self.assertEqual(len(clone._signatures), count)
+        name = clone.list_components()[0]
+        clone.get(name).general_parms.tran_x += 1.
+        self.assertNotEqual(self.signature(clone), original)
+        self.assertEqual(self.signature(geometry), original)
+
+    def test_unknown(self):
+        logging.debug('')
+        logging.debug('test_unknown')
+
+        # Elements from a newer VSP, unknown to this wrapper.
+        root = ElementTree.parse(os.path.join(self.directory,
+                                              'hwb.xml')).getroot()
+        ElementTree.SubElement(root, 'Future_Setting').text = 'on'
+        parms = root.find('Component_List').find('Component') \
+                    .find('General_Parms')
+        ElementTree.SubElement(parms, 'Future_Parm').text = '42'
+
+        geometry = VSPGeometry()
+        geometry.read(root)
+        geometry.materialize_all()
+        self.assertTrue('Future_Setting' in geometry.unknown_tags())
+        name = parms.findtext('Name').translate(XLATE)
+        general_parms = geometry.get(name).general_parms
+        self.assertEqual(general_parms.unknown_tags(), ['Future_Parm'])
+
+        # Written (with a modified value) and read again.
+        general_parms.tran_x = 1.
+        text = geometry.write_text()
+        reread = VSPGeometry()
+        reread.read(ElementTree.fromstring(text))
+        reread.materialize_all()
+        self.assertTrue('Future_Setting' in reread.unknown_tags())
+        general_parms = reread.get(name).general_parms
+        self.assertEqual(general_parms.unknown_tags(), ['Future_Parm'])
+        self.assertEqual(general_parms.tran_x, 1.)
+        self.assertEqual(ElementTree.fromstring(text).findtext('Future_Setting'),
+                         'on')
+
+    def test_write_text(self):
+        logging.debug('')
+        logging.debug('test_write_text')
+
+        for path in sorted(glob.glob(os.path.join(self.directory, '*.xml'))):
+            for lazy in (True, False):
+                logging.debug('    %s lazy %s', os.path.basename(path), lazy)
+                geometry = self.read(path, lazy)
+                reference = self.read(path, lazy)
+                self.assertEqual(geometry.write_text(),
+                                 ElementTree.tostring(reference.write(None)))
+
+                # Rendered from the compiled template.
+                for name in ('A & <B> 100%', ''):
+                    for geom in (geometry, reference):
+                        geom.cg_x += 1.5
+                        geom.geom_name = name
+                    self.assertEqual(geometry.write_text(),
+                                     ElementTree.tostring(reference.write(None)))
+
+    def test_execute(self):
+        logging.debug('')
+        logging.debug('test_execute')
+
+        orig_dir = os.getcwd()
+        tmpdir = tempfile.mkdtemp()
+        try:
+            os.chdir(tmpdir)
+            SimulationRoot.chroot(tmpdir)
+            shutil.copyfile(os.path.join(self.directory, 'hwb.xml'), 'hwb.xml')
+            vsp = set_as_top(VSP('hwb.xml'))
+            vsp.vsp_path = self.fake_vsp(tmpdir)
+            vsp.comp_geom = True
+            vsp.run()
+            self.assertEqual(vsp.return_code, 0)
+            self.assertEqual(vsp.wing_wet_area, 9.)
+            self.assertEqual(vsp.theoretical_volume, 2.)
+            self.assertTrue(os.path.exists('hwb.xml.new_CompGeom.txt'))
+            self.assertEqual(glob.glob('vsp-*'), [])  # Scratch removed.
+
+            # Missing output file, reported by the component.
+            vsp.write_xsec = True
+            try:
+                vsp.run()
+            except RuntimeError as exc:
+                self.assertTrue('Hermite file invalid' in str(exc))
+            else:
+                self.fail('Expected RuntimeError')
+            vsp.write_xsec = False
+
+            # Several at once.
+            comps = []
+            for i in range(3):
+                comp = set_as_top(vsp.clone())
+                comp.geometry.get(comp.geometry.list_components()[0]) \
+                    .general_parms.tran_x = float(i)
+                comps.append(comp)
+            self.assertEqual(run_concurrently(comps, max_running=2),
+                             [None, None, None])
+            for comp in comps:
+                self.assertEqual(comp.wetted_area, 9.)
+
+            # Stopped run.
+            vsp.vsp_path = self.fake_vsp(tmpdir, delay=60)
+            vsp.skip_cosmetic = False
+            run = vsp.start_execute()
+            vsp.stop()
+            while run.poll() is None:
+                time.sleep(0.1)
+            self.assertRaises(RunStopped, vsp.finish_execute, run)
+            self.assertEqual(glob.glob('vsp-*'), [])
+        finally:
+            os.chdir(orig_dir)
+            SimulationRoot.chroot(orig_dir)
+            shutil.rmtree(tmpdir)
+
+    def test_write_tree(self):
+        logging.debug('')
+        logging.debug('test_write_tree')
+
+        geometry = self.read(os.path.join(self.directory, 'hwb.xml'), True)
+        root = geometry.write_tree()
+
+        # Parameter changes update the kept tree.
+        name = geometry.list_components()[0]
+        comp = geometry.get(name)
+        comp.general_parms.tran_x += 1.
+        geometry.cg_x += 1.
+        self.assertTrue(geometry.write_tree() is root)
+        self.assertEqual(ElementTree.tostring(root),
+                         ElementTree.tostring(geometry.write(None)))
+
+        # Structural changes cause a rewrite.
+        root = geometry.write_tree()
+        comp.general_parms.add_trait('extra', Float(iotype='in'))
+        self.assertFalse(geometry.write_tree() is root)
+
+    def test_hermite(self):
+        logging.debug('')
+        logging.debug('test_hermite')
+
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, 'test.hrm')
+            with open(path, 'w') as out:
+                out.write('\nHERMITE INPUT FILE\n\n NAME = test\n'
+                          ' NUMBER OF COMPONENTS = 2\n')
+                for name, nsections, npoints in (('Wing', 2, 3),
+                                                 ('Fuse', 3, 2)):
+                    out.write('%s \n GROUP NUMBER      = 4 \n'
+                              ' TYPE              = 1  \n'
+                              ' CROSS SECTION FLAG   = 1 \n'
+                              ' SYMMETRY FLAG     = 1 \n'
+                              ' NUMBER OF CROSS SECTIONS =  %d \n'
+                              ' NUMBER OF PTS/CROSS SECTION = %d \n'
+                              % (name, nsections, npoints))
+                    for i in range(nsections * npoints):
+                        out.write('%25.17e  %25.17e  %25.17e\n'
+                                  % (i, i + 0.5, -i))
+            components = read_hermite(path)
+            self.assertEqual([comp.name for comp in components],
+                             ['Wing', 'Fuse'])
+            self.assertEqual(components[0].points.shape, (2, 3, 3))
+            self.assertEqual(components[1].points.shape, (3, 2, 3))
+            self.assertEqual(list(components[1].points[2, 1]), [5., 5.5, -5.])
+            self.assertEqual(components[0].group, 4)
+            self.assertEqual(components[0].symmetry, 1)
+
+            # Truncated.
+            with open(path, 'r') as inp:
+                lines = inp.readlines()
+            with open(path, 'w') as out:
+                out.writelines(lines[:-1])
+            self.assertRaises(ValueError, read_hermite, path)
+        finally:
+            shutil.rmtree(tmpdir)
+
+        # Keys as written by VSP.
+        components = read_hermite(os.path.join(self.directory, 'xsec.hrm'))
+        self.assertEqual([comp.name for comp in components],
+                         ['Fuselage', 'Wing'])
+        self.assertEqual(components[0].points.shape, (3, 4, 3))
+        self.assertEqual(components[1].points.shape, (2, 3, 3))
+        self.assertEqual(list(components[1].points[1, 1]), [6., 8., 0.05])
+        self.assertEqual(components[1].group, 1)
+        self.assertEqual(components[1].symmetry, 1)
+
+    def test_lazy(self):
+        logging.debug('')
+        logging.debug('test_lazy')
+
+        path = os.path.join(self.directory, 'Cessna182.xml')
+        geometry = self.read(path, True)
+        self.assertEqual(len(geometry.list_components()), 26)
+        self.assertEqual(len(list(geometry.xml_containers())), 1)
+
+        # Untouched components are written verbatim.
+        root = ElementTree.parse(path).getroot()
+        expected = [ElementTree.tostring(element).strip() for element in
+                    root.find('Component_List').findall('Component')]
+        written = [ElementTree.tostring(element).strip() for element in
+                   geometry.write(None).find('Component_List')]
+        self.assertEqual(sorted(written), sorted(expected))
+
+        # Read on first access.
+        name = geometry.list_components()[0]
+        comp = getattr(geometry, name)
+        self.assertTrue(name in geometry.list_containers())
+        self.assertEqual(comp.general_parms.part_name.translate(XLATE), name)
+
+    def test_mesh_quality(self):
+        logging.debug('')
+        logging.debug('test_mesh_quality')
+
+        # Unit cube, two right triangles per face.
+        corners = [(x, y, z) for x in (0., 1.) for y in (0., 1.)
+                             for z in (0., 1.)]
+        faces = []
+        for face in ((0, 1, 3, 2), (4, 6, 7, 5), (0, 4, 5, 1),
+                     (2, 3, 7, 6), (0, 2, 6, 4), (1, 5, 7, 3)):
+            faces.append((face[0], face[1], face[2]))
+            faces.append((face[0], face[2], face[3]))
+        vertices = numpy.array(corners)
+        faces = numpy.array(faces)
+
+        quality = mesh_quality(vertices, faces)
+        self.assertEqual(quality.num_tris, 12)
+        self.assertEqual(quality.edge_min, 1.)
+        self.assertAlmostEqual(quality.edge_max, numpy.sqrt(2.))
+        self.assertAlmostEqual(quality.skewness_max, 0.25)
+        self.assertEqual(list(quality.skewness_hist), [0, 12, 0, 0, 0])
+        self.assertEqual(quality.aspect_hist.sum(), 12)
+        self.assertTrue(quality.watertight)
+
+        # Open, and with an edge shared by three triangles.
+        quality = mesh_quality(vertices, faces[:-1])
+        self.assertEqual(quality.boundary_edges, 3)
+        self.assertFalse(quality.watertight)
+        quality = mesh_quality(numpy.concatenate((vertices, [[0.5, 0.5, 2.]])),
+                               numpy.concatenate((faces, [[0, 1, 8]])))
+        self.assertEqual(quality.nonmanifold_edges, 1)
+        self.assertEqual(quality.boundary_edges, 2)
+
+        # Equilateral and degenerate triangles.
+        vertices = numpy.array([[0., 0., 0.], [1., 0., 0.],
+                                [0.5, numpy.sqrt(3.) / 2., 0.], [2., 0., 0.]])
+        quality = mesh_quality(vertices, numpy.array([[0, 1, 2]]))
+        self.assertAlmostEqual(quality.aspect_max, 1.)
+        self.assertAlmostEqual(quality.skewness_max, 0.)
+        quality = mesh_quality(vertices, numpy.array([[0, 1, 3]]))
+        self.assertEqual(quality.aspect_max, numpy.inf)
+        self.assertEqual(quality.skewness_max, 1.)
+
+    def test_monitor(self):
+        logging.debug('')
+        logging.debug('test_monitor')
+
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, 'vsp.log')
+
+            # No log yet.
+            monitor = LogMonitor(path, [PatternMatcher('Segmentation',
+                                                       fatal=True)])
+            self.assertEqual(monitor.poll(), None)
+
+            # Fatal pattern, seen once its line is complete.
+            with open(path, 'w') as out:
+                out.write('Reading model\nSegmentat')
+            self.assertEqual(monitor.poll(), None)
+            with open(path, 'a') as out:
+                out.write('ion fault\n')
+            self.assertEqual(monitor.poll(), "found 'Segmentation fault'")
+            monitor.close()
+
+            # Triangle budget.
+            os.remove(path)
+            monitor = LogMonitor(path, [TriangleBudget(1000)])
+            with open(path, 'w') as out:
+                out.write('Total Num Tris = 900\n')
+            self.assertEqual(monitor.poll(), None)
+            with open(path, 'a') as out:
+                out.write('Total Num Tris = 1500\n')
+            self.assertEqual(monitor.poll(),
+                             'triangle count 1500 exceeds 1000')
+            monitor.close()
+
+            # Time budget.
+            monitor = LogMonitor(path, [TimeBudget(10)])
+            self.assertEqual(monitor.poll(5.), None)
+            self.assertEqual(monitor.poll(12.),
+                             'run time 12.0 exceeds 10 seconds')
+            monitor.close()
+
+            # Required message, last line without newline is only
+            # processed by finish().
+            with open(path, 'w') as out:
+                out.write('Meshing\r\nTotal Num Tris = 900')
+            monitor = LogMonitor(path, [RequiredMatcher('Total Num Tris',
+                                                        'Meshing failed')])
+            self.assertEqual(monitor.poll(), None)
+            self.assertFalse(monitor.matchers[0].found)
+            self.assertEqual(monitor.finish(), None)
+
+            with open(path, 'w') as out:
+                out.write('Meshing\n')
+            monitor = LogMonitor(path, [RequiredMatcher('Total Num Tris',
+                                                        'Meshing failed')])
+            self.assertEqual(monitor.poll(), None)
+            self.assertEqual(monitor.finish(), 'Meshing failed')
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_nascart(self):
+        logging.debug('')
+        logging.debug('test_nascart')
+
+        tmpdir = tempfile.mkdtemp()
+        try:
+            dat_path = os.path.join(tmpdir, 'bodyin.dat')
+            with open(dat_path, 'w') as out:
+                out.write('4 3\n')
+                for node in ((0., 0., 0.), (1., 0., 0.), (0., 1., 0.),
+                             (0., 0., 1.)):
+                    out.write('%16.10g %16.10g %16.10g\n' % node)
+                for tri, tag in (((1, 2, 3), 1), ((1, 2, 4), 2),
+                                 ((2, 3, 4), 2)):
+                    out.write('%d %d %d %d.0\n' % (tri + (tag,)))
+            key_path = os.path.join(tmpdir, 'bodyin.key')
+            with open(key_path, 'w') as out:
+                out.write('# tag name\n2\n1 Wing\n2 Fuselage\n')
+
+            mesh = read_nascart(dat_path, key_path)
+            self.assertEqual(mesh.nodes.shape, (4, 3))
+            self.assertEqual(mesh.tris.tolist(),
+                             [[0, 1, 2], [0, 1, 3], [1, 2, 3]])
+            self.assertEqual(mesh.tags.tolist(), [1, 2, 2])
+            self.assertEqual(mesh.names, {1: 'Wing', 2: 'Fuselage'})
+            self.assertEqual(len(mesh.component_tris('Fuselage')), 2)
+            self.assertRaises(KeyError, mesh.component_tris, 'Tail')
+            self.assertEqual(read_nascart(dat_path, None).names, {})
+
+            with open(dat_path, 'a') as out:
+                out.write('1 2\n')
+            self.assertRaises(ValueError, read_nascart, dat_path, key_path)
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_precedence(self):
+        logging.debug('')
+        logging.debug('test_precedence')
+
+        def model(components):
+            root = ElementTree.Element('Vsp_Geometry')
+            component_list = ElementTree.SubElement(root, 'Component_List')
+            for name, ptr_id, parent_id in components:
+                component = ElementTree.SubElement(component_list, 'Component')
+                ElementTree.SubElement(component, 'Type').text = 'Blank'
+                parms = ElementTree.SubElement(component, 'General_Parms')
+                ElementTree.SubElement(parms, 'Name').text = name
+                ElementTree.SubElement(parms, 'PtrID').text = ptr_id
+                ElementTree.SubElement(parms, 'Parent_PtrID').text = parent_id
+            return root
+
+        # Children before parents, nested several levels.
+        geometry = VSPGeometry()
+        geometry.read(model([('D', '4', '3'), ('C', '3', '2'), ('E', '5', '1'),
+                             ('B', '2', '1'), ('A', '1', '0'), ('F', '6', '0')]))
+        self.assertEqual(geometry.list_components(),
+                         ['A', 'E', 'B', 'C', 'D', 'F'])
+
+        geometry = VSPGeometry()
+        try:
+            geometry.read(model([('A', '1', '0'), ('B', '2', '7')]))
+        except RuntimeError as exc:
+            self.assertTrue(str(exc).endswith('Cannot find parent!'))
+        else:
+            self.fail('Expected RuntimeError')
+
+        geometry = VSPGeometry()
+        try:
+            geometry.read(model([('A', '1', '0'), ('B', '2', '3'),
+                                 ('C', '3', '2')]))
+        except RuntimeError as exc:
+            self.assertTrue(str(exc).endswith('Component parent cycle!?'))
+        else:
+            self.fail('Expected RuntimeError')
+
+    def test_slices(self):
+        logging.debug('')
+        logging.debug('test_slices')
+
+        # Area x**2 (second derivative 2) on nonuniform stations, and
+        # twice that (second derivative 4).
+        x = numpy.array([0., 0.5, 1.5, 2., 3.])
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, 'test_Slice.txt')
+            with open(path, 'w') as out:
+                out.write('Slice results\nMach = 1.2\n')
+                for theta, scale in ((0., 1.), (90., 2.)):
+                    out.write('Theta = %g\n  X    Area\n' % theta)
+                    for station in x:
+                        out.write('%f, %f\n' % (station, scale * station**2))
+            angles, stations, area = read_slices(path)
+            self.assertEqual(list(angles), [0., 90.])
+            self.assertEqual(area.shape, (2, 5))
+            self.assertEqual(list(stations[1]), list(x))
+
+            max_area, smoothness, d2_max = area_rule(stations, area)
+            self.assertEqual(list(max_area), [9., 18.])
+            for i, d2 in enumerate((2., 4.)):
+                self.assertAlmostEqual(d2_max[i], d2)
+                self.assertAlmostEqual(smoothness[i], d2 * d2 * 1.5)
+
+            with open(path, 'a') as out:
+                out.write('Theta = 180\n0.0 0.0\n')
+            self.assertRaises(ValueError, read_slices, path)
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_snapshot(self):
+        logging.debug('')
+        logging.debug('test_snapshot')
+
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, 'hwb.xml')
+            shutil.copy(os.path.join(self.directory, 'hwb.xml'), path)
+            self.assertEqual(load_snapshot(path), None)
+
+            geometry = self.read(path, True)
+            names = geometry.list_components()
+            geometry.get(names[0]).general_parms.tran_x = 1.
+            save_snapshot(geometry, path)
+            self.assertTrue(os.path.exists(snapshot_path(path)))
+            loaded = load_snapshot(path)
+            self.assertEqual(loaded.list_components(), names)
+
+            # Unread components stay unread.
+            self.assertFalse(names[0] in loaded._lazy)
+            self.assertEqual(loaded._lazy, set(names[1:]))
+            self.assertEqual(loaded.get(names[0]).general_parms.tran_x, 1.)
+            self.assertEqual(loaded.write_text(), geometry.write_text())
+
+            # Stale once the XML file changes.
+            with open(path, 'a') as out:
+                out.write('\n')
+            self.assertEqual(load_snapshot(path), None)
+
+            # Separate snapshot directory.
+            save_snapshot(geometry, path, tmpdir)
+            self.assertNotEqual(snapshot_path(path, tmpdir), snapshot_path(path))
+            self.assertEqual(load_snapshot(path, tmpdir).write_text(),
+                             geometry.write_text())
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_batch_errors(self):
+        logging.debug('')
+        logging.debug('test_batch_errors')
+
+        # Workers which can't be set up report each point as failed
+        # (rather than the pool hanging).
+        tmpdir = tempfile.mkdtemp()
+        try:
+            batch = VSPBatch(os.path.join(tmpdir, 'no_such.xml'), processes=1)
+            results = batch.run([{}, {}])
+            self.assertEqual(list(results.failed), [True, True])
+
+            shutil.copyfile(os.path.join(self.directory, 'hwb.xml'),
+                            os.path.join(tmpdir, 'hwb.xml'))
+            batch = VSPBatch(os.path.join(tmpdir, 'hwb.xml'), processes=2,
+                             options={'no_such_option': 1})
+            results = list(batch.imap([{}, {}, {}]))
+            self.assertEqual([result[0] for result in results], [0, 1, 2])
+            for index, values, error in results:
+                self.assertEqual(values, None)
+                self.assertTrue(error.startswith('Worker setup failed'))
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_cache(self):
+        logging.debug('')
+        logging.debug('test_cache')
+
+        tmpdir = tempfile.mkdtemp()
+        try:
+            src = os.path.join(tmpdir, 'src')
+            dest = os.path.join(tmpdir, 'dest')
+            os.mkdir(src)
+            os.mkdir(dest)
+            cache = ResultCache(os.path.join(tmpdir, 'cache'), 250)
+            keys = [hashlib.sha1(str(i)).hexdigest() for i in range(4)]
+
+            def store(key, data):
+                with open(os.path.join(src, 'out.txt'), 'wb') as out:
+                    out.write(data)
+                cache.store(key, src, ['out.txt', 'missing.txt'])
+
+            def fetched(key):
+                names = cache.fetch(key, dest)
+                if names is None:
+                    return None
+                self.assertEqual(names, ['out.txt'])
+                with open(os.path.join(dest, 'out.txt'), 'rb') as inp:
+                    return inp.read()
+
+            def age(key, mtime):
+                os.utime(cache._entry_path(key), (mtime, mtime))
+
+            self.assertEqual(fetched(keys[0]), None)
+            store(keys[0], 'a' * 100)
+            self.assertEqual(fetched(keys[0]), 'a' * 100)
+
+            # An existing entry is kept.
+            store(keys[0], 'b' * 100)
+            self.assertEqual(fetched(keys[0]), 'a' * 100)
+
+            # Over max_size, least recently used entries are evicted.
+            store(keys[1], 'c' * 100)
+            age(keys[0], 1000)
+            age(keys[1], 2000)
+            store(keys[2], 'd' * 100)
+            self.assertEqual(fetched(keys[0]), None)
+            self.assertEqual(fetched(keys[2]), 'd' * 100)
+            self.assertEqual(fetched(keys[1]), 'c' * 100)  # Now recent.
+            age(keys[2], 1000)
+            store(keys[3], 'e' * 100)
+            self.assertEqual(fetched(keys[2]), None)
+            self.assertEqual(fetched(keys[1]), 'c' * 100)
+            self.assertEqual(fetched(keys[3]), 'e' * 100)
+
+            # No temporary or evicted directories left behind.
+            self.assertEqual([name for name in os.listdir(cache.directory)
+                              if name.startswith('.')], [])
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_cache_key(self):
+        logging.debug('')
+        logging.debug('test_cache_key')
+
+        tmpdir = tempfile.mkdtemp()
+        try:
+            xml_path = os.path.join(tmpdir, 'model.xml')
+            shutil.copyfile(os.path.join(self.directory, 'hwb.xml'), xml_path)
+            xsec_path = os.path.join(tmpdir, 'wing.af')
+            with open(xsec_path, 'w') as out:
+                out.write('original\n')
+            cmd = ['vsp', '-batch', 'model.xml']
+
+            key = ResultCache.make_key(xml_path, cmd, [xsec_path])
+            self.assertEqual(ResultCache.make_key(xml_path, cmd, [xsec_path]),
+                             key)
+            self.assertNotEqual(ResultCache.make_key(xml_path, cmd), key)
+
+            # Edited input file.
+            with open(xsec_path, 'w') as out:
+                out.write('modified\n')
+            self.assertNotEqual(
+                ResultCache.make_key(xml_path, cmd, [xsec_path]), key)
+
+            # Missing input file.
+            os.remove(xsec_path)
+            self.assertNotEqual(
+                ResultCache.make_key(xml_path, cmd, [xsec_path]), key)
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_clone(self):
+        logging.debug('')
+        logging.debug('test_clone')
+
+        path = os.path.join(self.directory, '777.xml')
+        geometry = self.read(path, True)
+        name = geometry.list_components()[0]
+        getattr(geometry, name).general_parms.tran_x = 1.
+        original = geometry.write_text()
+
+        clone = geometry.clone()
+        self.assertEqual(clone.write_text(), original)
+
+        # Untouched components share XML data.
+        other = geometry.clone()
+        for entry, other_entry in zip(clone._components, other._components):
+            self.assertTrue(entry[1] is other_entry[1])
+
+        # Changes to clone don't affect original and vice versa.
+        getattr(clone, name).general_parms.tran_x = 2.
+        self.assertEqual(geometry.write_text(), original)
+        self.assertEqual(getattr(other, name).general_parms.tran_x, 1.)
+        getattr(geometry, name).general_parms.tran_x = 3.
+        self.assertEqual(getattr(clone, name).general_parms.tran_x, 2.)
+        self.assertEqual(geometry.clone().get(name).general_parms.tran_x, 3.)
+
+    def test_points(self):
+        logging.debug('')
+        logging.debug('test_points')
+
+        path = os.path.join(self.directory, 'eagle_eye.xml')
+        root = ElementTree.parse(path).getroot()
+        expected = [element.text for element in root.iter()
+                    if element.tag in ('Upper_Pnts', 'Lower_Pnts')]
+        geometry = self.read(path, False)
+        airfoils = [container for container in geometry.xml_containers()
+                    if container.trait('upper_pnts') is not None]
+        self.assertEqual(len(airfoils) * 2, len(expected))
+
+        airfoil = airfoils[0]
+        upper = airfoil.upper_pnts
+        self.assertEqual(upper.dtype, numpy.float64)
+        self.assertEqual(upper.shape[1], 2)
+        self.assertTrue(len(upper) > 2)
+        self.assertTrue(all(upper[:, 0] >= 0.) and all(upper[:, 0] <= 1.))
+
+        # Written back as read.
+        written = geometry.write(None)
+        self.assertEqual([element.text for element in written.iter()
+                          if element.tag in ('Upper_Pnts', 'Lower_Pnts')],
+                         expected)
+
+        # Written as VSP does.
+        airfoil.upper_pnts = numpy.array([[0., 0.], [1., 0.5]])
+        self.assertTrue('<Upper_Pnts>0.000000, 0.000000,1.000000, 0.500000,'
+                        '</Upper_Pnts>' in geometry.write_text())
+
+    def test_mesh(self):
+        logging.debug('')
+        logging.debug('test_mesh')
+
+        path = os.path.join(self.directory, 'hwb.xml')
+        geometry = self.read(path, False)
+        meshes = [comp for comp in [getattr(geometry, name) for name in
+                                    geometry.list_components()]
+                  if isinstance(comp, Mesh)]
+        self.assertEqual(len(meshes), 1)
+        parms = meshes[0].mesh_parms
+        tris = parms.get_tris()
+        self.assertEqual(tris.dtype, TRI_DTYPE)
+        self.assertEqual(len(tris), 312)
+        self.assertEqual(parms.num_tris, 312)
+        self.assertEqual(list(tris[0]['normal']), [0., -1., 0.])
+        self.assertEqual(list(tris[0]['vertices'][0]), [21., 0., 0.])
+
+        # Replacing triangles updates the count and the written text.
+        original = geometry.write_text()
+        parms.set_tris(tris.view(float).reshape((-1, 12))[:2])
+        self.assertEqual(parms.num_tris, 2)
+        text = geometry.write_text()
+        self.assertEqual(text.count('<Tri>'), 2)
+        self.assertEqual(text, ElementTree.tostring(geometry.write(None)))
+        parms.set_tris(tris)
+        self.assertEqual(geometry.write_text(), original)
+
+        self.assertRaises(ValueError, parms.set_tris, numpy.zeros((2, 3)))
+
+        # Properties of a unit cube offset from the origin.
+        mesh = meshes[0]
+        self.assertTrue(mesh.area > 0. and mesh.volume > 0.)
+        corners = [(x+1., y+2., z+3.) for x in (0, 1) for y in (0, 1)
+                                       for z in (0, 1)]
+        rows = []
+        for face in ((0, 1, 3, 2), (4, 6, 7, 5), (0, 4, 5, 1),
+                     (2, 3, 7, 6), (0, 2, 6, 4), (1, 5, 7, 3)):
+            for i, j, k in ((0, 1, 2), (0, 2, 3)):
+                rows.append(corners[face[i]] + corners[face[j]] +
+                            corners[face[k]] + (0., 0., 0.))
+        parms.set_tris(numpy.array(rows))
+        self.assertAlmostEqual(mesh.area, 6.)
+        self.assertAlmostEqual(mesh.volume, 1.)
+        self.assertEqual(list(mesh.centroid), [1.5, 2.5, 3.5])
+        self.assertEqual(list(mesh.bbox_min), [1., 2., 3.])
+        self.assertEqual(list(mesh.bbox_max), [2., 3., 4.])
+
+    def test_comp_geom(self):
+        logging.debug('')
+        logging.debug('test_comp_geom')
+
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, 'test_CompGeom.csv')
+            with open(path, 'w') as out:
+                out.write('Name, Theo_Area, Wet_Area, Theo_Vol, Wet_Vol\n'
+                          'Wing, 10.5, 9.0, 2.0, 1.5\n'
+                          'Pod_1, 20.0, 18.0, 5.0, 4.0\n'
+                          'Wing, 10.5, 9.0, 2.0, 1.5\n'
+                          'Totals, 41.0, 36.0, 9.0, 7.0\n')
+            table, totals = read_comp_geom(path)
+            self.assertEqual(totals, (41., 36., 9., 7.))
+            self.assertEqual(list(table['name']), ['Wing', 'Pod_1', 'Wing'])
+            index = index_names(table)
+            self.assertEqual(index['Wing'], [0, 2])
+            self.assertEqual(table[index['Pod_1']]['wetted_volume'], [4.])
+
+            with open(path, 'a') as out:
+                out.write('Bad, 1.0\n')
+            self.assertRaises(ValueError, read_comp_geom, path)
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_stl(self):
+        logging.debug('')
+        logging.debug('test_stl')
+
+        # Unit cube, two solids.
+        corners = [(x, y, z) for x in (0., 1.) for y in (0., 1.)
+                             for z in (0., 1.)]
+        triangles = []
+        for face in ((0, 1, 3, 2), (4, 6, 7, 5), (0, 4, 5, 1),
+                     (2, 3, 7, 6), (0, 2, 6, 4), (1, 5, 7, 3)):
+            for i, j, k in ((0, 1, 2), (0, 2, 3)):
+                triangles.append((corners[face[i]], corners[face[j]],
+                                  corners[face[k]]))
+
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, 'ascii.stl')
+            with open(path, 'w') as out:
+                for name, part in (('Fuse', triangles[:4]),
+                                   ('Wing', triangles[4:])):
+                    out.write('solid %s\n' % name)
+                    for triangle in part:
+                        out.write(' facet normal 0 0 0\n  outer loop\n')
+                        for vertex in triangle:
+                            out.write('   vertex %e %e %e\n' % vertex)
+                        out.write('  endloop\n endfacet\n')
+                    out.write('endsolid %s\n' % name)
+            # Small chunks to exercise line splitting.
+            mesh = read_stl(path, chunk_size=100)
+            self.assertEqual(mesh.names, ['Fuse', 'Wing'])
+            self.assertEqual(list(mesh.starts), [0, 4])
+            self.assertEqual(mesh.vertices.shape, (8, 3))
+            self.assertEqual(mesh.faces.shape, (12, 3))
+            self.assertEqual(len(mesh.solid_faces('Wing')), 8)
+            self.assertTrue((mesh.triangles() == numpy.array(triangles)).all())
+            self.assertRaises(KeyError, mesh.solid_faces, 'Tail')
+
+            path = os.path.join(tmpdir, 'binary.stl')
+            records = numpy.zeros(len(triangles),
+                                  dtype=[('normal', '<f4', 3),
+                                         ('vertices', '<f4', (3, 3)),
+                                         ('attribute', '<u2')])
+            records['vertices'] = triangles
+            with open(path, 'wb') as out:
+                out.write('solid cube'.ljust(80, '\0'))
+                out.write(numpy.array([len(records)], '<u4').tostring())
+                out.write(records.tostring())
+            binary = read_stl(path)
+            self.assertEqual(binary.names, ['cube'])
+            self.assertTrue((binary.vertices == mesh.vertices).all())
+            self.assertTrue((binary.faces == mesh.faces).all())
+        finally:
+            shutil.rmtree(tmpdir)
+
+        # Welding within a tolerance.
+        points = numpy.array([[0., 0., 0.], [1e-9, 0., 0.], [1., 0., 0.]])
+        self.assertEqual(len(weld(points)[0]), 3)
+        vertices, faces = weld(points, 1e-6)
+        self.assertEqual(len(vertices), 2)
+        self.assertEqual(list(faces[0]), [0, 0, 1])
+
+    def test_vector(self):
+        logging.debug('')
+        logging.debug('test_vector')
+
+        vsp = set_as_top(VSP(os.path.join(self.directory, 'hwb.xml')))
+        pattern = 'geometry.*.Section_*.sweep'
+        names = vsp.vector_names(pattern)
+        self.assertTrue(names)
+
+        x = vsp.get_vector(pattern)
+        self.assertEqual(len(x), len(names))
+        self.assertEqual(x[0], vsp.get(names[0]))
+        low, high = vsp.get_bounds()
+        self.assertTrue(all(low == -85.) and all(high == 85.))
+
+        vsp.set_vector(x + 1.)
+        self.assertEqual(vsp.get(names[-1]), x[-1] + 1.)
+        vsp.set_vector([0.], [names[0]])
+        self.assertEqual(vsp.get(names[0]), 0.)
+
+        low, high = vsp.get_bounds(['geometry.cg_x'])
+        self.assertEqual((low[0], high[0]), (-numpy.inf, numpy.inf))
+
+        self.assertRaises(ValueError, vsp.set_vector, [1., 2.])
+        self.assertRaises(KeyError, vsp.get_vector, 'geometry.no_such_*')
+
+        # A failed selection leaves the previous one in place.
+        self.assertEqual(vsp.vector_names(), ['geometry.cg_x'])
+
+
+if __name__ == '__main__':
+    sys.argv.append('--cover-package=vsp_wrapper.')
+    sys.argv.append('--cover-erase')
+    nose.runmodule()
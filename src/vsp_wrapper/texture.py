@@ -7,10 +7,12 @@ class Texture(XMLContainer):
     """ XML parameters for a texture/image applied to a surface. """
 
     XMLTAG = 'Applied_Texture'
+    AFFECTS = 'display'
 
     texture_name = Str('Default_Name', iotype='in', xmltag='Name',
                        desc='Name of texture.')
     texture_filename = Str('Default_Name', iotype='in', xmltag='Texture_Name',
+                           input_file=True,
                            desc='Filename for texture data (.jpg or .tga)')
     all_surf_flag = Bool(False, iotype='in', xmltag='All_Surf_Flag',
                          desc='If True, apply to all surfaces of component.')
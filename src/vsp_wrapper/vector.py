@@ -0,0 +1,116 @@
+"""
+Access numeric XML parameters of a geometry as vectors.
+
+A :class:`ParameterIndex` lists every float and integer XML parameter of a
+geometry (reading all components) by path, such as
+``'geometry.Wing.wing_parms.sweep'``, along with its bounds. Parameters are
+selected by a list of paths or a shell-style pattern and then read or
+written in bulk without per-parameter path lookups.
+"""
+
+import fnmatch
+
+import numpy
+
+from vsp_wrapper.xml_container import XMLContainer
+
+
+class ParameterEntry(object):
+    """ One numeric parameter: `name` of `container`, found at `path`. """
+
+    __slots__ = ('path', 'container', 'name', 'is_int', 'low', 'high')
+
+    def __init__(self, path, container, name, is_int, low, high):
+        self.path = path
+        self.container = container
+        self.name = name
+        self.is_int = is_int
+        self.low = low
+        self.high = high
+
+
+class ParameterIndex(object):
+    """
+    Index of numeric XML parameters of `geometry`. Paths start with
+    `prefix`. Parameters are listed in container order, then by name.
+    """
+
+    def __init__(self, geometry, prefix='geometry.'):
+        geometry.materialize_all()
+        self.geometry = geometry
+        self.generation = geometry._generation
+        self.entries = []
+        self._by_path = {}
+        self._add_container(geometry, prefix)
+
+    def _add_container(self, container, prefix):
+        """ Add parameters of `container` and those below it. """
+        for name, xmltag, default, from_text, to_text in container.get_codecs():
+            if from_text is not float and from_text is not int:
+                continue
+            trait = container.trait(name)
+            values = trait.values
+            if values:  # Enum.
+                low, high = min(values), max(values)
+            else:
+                low, high = trait.low, trait.high
+            entry = ParameterEntry(prefix+name, container, name,
+                                   from_text is int,
+                                   -numpy.inf if low is None else low,
+                                   numpy.inf if high is None else high)
+            self.entries.append(entry)
+            self._by_path[entry.path] = entry
+
+        for name in sorted(container.list_containers()):
+            obj = getattr(container, name)
+            if isinstance(obj, XMLContainer):
+                self._add_container(obj, '%s%s.' % (prefix, name))
+
+    def is_current(self, geometry):
+        """ Returns True if this index is valid for `geometry`. """
+        return geometry is self.geometry and \
+               geometry._generation == self.generation
+
+    def select(self, names):
+        """
+        Returns list of entries selected by `names`, either a pattern
+        matched against all paths or a list of paths and patterns.
+        """
+        if isinstance(names, basestring):
+            names = [names]
+        selected = []
+        for name in names:
+            entry = self._by_path.get(name)
+            if entry is not None:
+                selected.append(entry)
+                continue
+            matches = [entry for entry in self.entries
+                       if fnmatch.fnmatchcase(entry.path, name)]
+            if not matches:
+                raise KeyError('%r matches no numeric XML parameter' % name)
+            selected.extend(matches)
+        return selected
+
+
+def get_values(entries):
+    """ Returns float array of current values for `entries`. """
+    return numpy.array([getattr(entry.container, entry.name)
+                        for entry in entries], dtype=float)
+
+
+def set_values(entries, values):
+    """ Set parameters for `entries` from `values`. """
+    if len(values) != len(entries):
+        raise ValueError('Expecting %d values, got %d'
+                         % (len(entries), len(values)))
+    for entry, value in zip(entries, values):
+        if entry.is_int:
+            setattr(entry.container, entry.name, int(round(value)))
+        else:
+            setattr(entry.container, entry.name, float(value))
+
+
+def get_bounds(entries):
+    """ Returns ``(low, high)`` float arrays for `entries`. """
+    return (numpy.array([entry.low for entry in entries], dtype=float),
+            numpy.array([entry.high for entry in entries], dtype=float))
@@ -7,6 +7,7 @@ class VirtWindow(XMLContainer):
     """ XML parameters for a virtual window. """
 
     XMLTAG = 'VirtWindow'
+    AFFECTS = 'display'
 
     back_img_scale_w = Float(1.0, iotype='in', xmltag='Back_Img_Scale_W',
                              desc='Backgrund image width scaling.')
@@ -1,4 +1,6 @@
-from openmdao.lib.datatypes.api import Bool, Float, Int, Str
+from numpy import zeros
+
+from openmdao.lib.datatypes.api import Array, Bool, Float, Int, Str
 
 from vsp_wrapper.airfoil       import Airfoil
 from vsp_wrapper.component     import VSPComponent
@@ -154,9 +156,8 @@ class WingParms(XMLContainer):
                                 desc='')
     strake_aft_flag = Bool(iotype='in', xmltag='Strake_Aft_Flag',
                            desc='')
-# TODO: handle array.
-    deflect_pnts = Str(iotype='in', xmltag='Deflect_Pnts',
-                       desc='')
+    deflect_pnts = Array(zeros((0, 3)), iotype='in', xmltag='Deflect_Pnts',
+                         group=3, desc='Deflection points, three values each.')
 
     def __init__(self):
         super(WingParms, self).__init__(self.XMLTAG)
@@ -1,13 +1,36 @@
-import csv
+import hashlib
 import os
+import shutil
+import tempfile
+import time
 import xml.etree.cElementTree as ElementTree
 
-from openmdao.main.api import FileMetadata
-from openmdao.lib.datatypes.api import Bool, Float, Int, Str
+from contextlib import contextmanager
+from xml.sax.saxutils import escape
+
+import numpy
+
+from openmdao.main.api import Container, FileMetadata
+from openmdao.main.exceptions import RunInterrupted, RunStopped
+from openmdao.lib.datatypes.api import Array, Bool, Float, Instance, Int, \
+                                     List, Str
 from openmdao.lib.components.external_code import ExternalCode
 from openmdao.util.fileutil import find_in_path
+from openmdao.util.shellproc import ShellProc
 
+from vsp_wrapper.cache    import ResultCache, update_file_hashes
+from vsp_wrapper.compgeom import empty_table, index_names, read_comp_geom
 from vsp_wrapper.geometry import VSPGeometry
+from vsp_wrapper.hermite  import read_hermite
+from vsp_wrapper.meshquality import mesh_quality
+from vsp_wrapper.nascart  import NascartMesh, read_nascart
+from vsp_wrapper.monitor  import LogMonitor, PatternMatcher, \
+                                 RequiredMatcher, TimeBudget, TriangleBudget
+from vsp_wrapper.slices   import area_rule, read_slices
+from vsp_wrapper.snapshot import load_snapshot, save_snapshot
+from vsp_wrapper.stl      import STLMesh, read_stl, solid_properties
+from vsp_wrapper.vector   import ParameterIndex, get_bounds, get_values, \
+                                 set_values
 
 class VSP(ExternalCode):
     """
@@ -24,6 +47,11 @@ class VSP(ExternalCode):
     comp_geom = Bool(True, iotype='in',
                      desc='Compute areas and volumes.')
 
+    stereo_analysis = Bool(False, iotype='in',
+                           desc='Compute theoretical areas and volumes from'
+                                ' Stereolith output rather than running'
+                                ' CompGeom (wetted values are not computed).')
+
     generate_cfd_mesh = Bool(False, iotype='in',
                              desc='Generate CFD mesh in STL and NASCART files.')
 
@@ -40,6 +68,59 @@ class VSP(ExternalCode):
     write_tecplot = Bool(False, iotype='in', desc='Write Tecplot file.')
     write_stecplot = Bool(False, iotype='in', desc='Write structured Tecplot file.')
 
+    fatal_patterns = List(Str, iotype='in',
+                          desc='Regular expressions which abort VSP when'
+                               ' found in its output.')
+    max_mesh_tris = Int(0, low=0, iotype='in',
+                        desc='Abort CFD meshing if VSP reports more triangles'
+                             ' than this (zero implies no limit).')
+    max_mesh_time = Float(0., low=0., units='s', iotype='in',
+                          desc='Abort CFD meshing if it takes longer than'
+                               ' this (zero implies no limit).')
+    max_mesh_aspect = Float(0., low=0., iotype='in',
+                            desc='Reject a CFD mesh with any triangle of'
+                                 ' larger aspect ratio (zero implies no'
+                                 ' limit).')
+    max_mesh_skewness = Float(0., low=0., high=1., iotype='in',
+                              desc='Reject a CFD mesh with any triangle of'
+                                   ' larger skewness (zero implies no'
+                                   ' limit).')
+    min_mesh_edge = Float(0., low=0., iotype='in',
+                          desc='Reject a CFD mesh with any edge shorter than'
+                               ' this (zero implies no limit).')
+    require_watertight = Bool(False, iotype='in',
+                              desc='Reject a CFD mesh with boundary or'
+                                   ' non-manifold edges.')
+
+    scratch_dirs = Bool(True, iotype='in',
+                        desc='Run VSP in a private scratch directory, so'
+                             ' several VSP runs may share a directory.')
+
+    cache_dir = Str('', iotype='in',
+                    desc='Directory for cached results, no caching if empty.'
+                         ' May be shared by several processes.')
+    cache_size = Int(1024, low=1, iotype='in',
+                     desc='Maximum size of cache directory in megabytes.')
+
+    skip_cosmetic = Bool(True, iotype='in',
+                         desc='Skip running VSP if only display parameters'
+                              ' (colors, textures, etc.) have changed since'
+                              ' the last successful run.')
+
+    use_snapshots = Bool(False, iotype='in',
+                         desc='Load the geometry from a binary snapshot of the'
+                              ' XML file when current, else save one.')
+    snapshot_dir = Str('', iotype='in',
+                       desc='Directory for snapshots, next to the XML file'
+                            ' if empty.')
+
+    load_stl = Bool(True, iotype='in',
+                    desc='Load STL files written by VSP into stl_mesh and'
+                         ' cfd_stl_mesh.')
+    stl_tolerance = Float(0., low=0., iotype='in',
+                          desc='Distance within which STL vertices are'
+                               ' welded, zero for identical vertices only.')
+
     theoretical_area = Float(iotype='out', desc='Total area of all parts.')
     wetted_area = Float(iotype='out', desc='Total external area.')
     theoretical_volume = Float(iotype='out', desc='Total volume of all parts.')
@@ -48,12 +129,82 @@ class VSP(ExternalCode):
     vert_wet_area = Float(iotype='out', desc='External area of vertical tail.')
     wing_wet_area = Float(iotype='out', desc='External area of wing.')
     fuse_wet_area = Float(iotype='out', desc='External area of fuselage.')
-
-    def __init__(self, xml_filename):
+    comp_geom_table = Array(iotype='out',
+                            desc='CompGeom results per part: name,'
+                                 ' theoretical_area, wetted_area,'
+                                 ' theoretical_volume, wetted_volume.')
+    slice_angles = Array(iotype='out',
+                         desc='Mach cone roll angles of slices (deg).')
+    slice_x = Array(iotype='out',
+                    desc='Slice stations, one row per angle.')
+    slice_area = Array(iotype='out',
+                       desc='Slice areas, one row per angle.')
+    slice_max_area = Array(iotype='out',
+                           desc='Maximum slice area per angle.')
+    slice_smoothness = Array(iotype='out',
+                             desc='Integral of squared second derivative of'
+                                  ' area per angle.')
+    slice_d2_max = Array(iotype='out',
+                         desc='Maximum magnitude of second derivative of'
+                              ' area per angle.')
+    mesh_num_tris = Int(0, iotype='out', desc='CFD mesh triangle count.')
+    mesh_edge_min = Float(0., iotype='out', desc='CFD mesh minimum edge length.')
+    mesh_edge_max = Float(0., iotype='out', desc='CFD mesh maximum edge length.')
+    mesh_edge_mean = Float(0., iotype='out', desc='CFD mesh mean edge length.')
+    mesh_aspect_max = Float(0., iotype='out',
+                            desc='CFD mesh maximum triangle aspect ratio.')
+    mesh_aspect_hist = Array(iotype='out',
+                             desc='CFD mesh triangle counts by aspect ratio,'
+                                  ' see meshquality.ASPECT_BINS.')
+    mesh_skewness_max = Float(0., iotype='out',
+                              desc='CFD mesh maximum triangle skewness.')
+    mesh_skewness_hist = Array(iotype='out',
+                               desc='CFD mesh triangle counts by skewness,'
+                                    ' see meshquality.SKEWNESS_BINS.')
+    mesh_boundary_edges = Int(0, iotype='out',
+                              desc='CFD mesh edges used by one triangle.')
+    mesh_nonmanifold_edges = Int(0, iotype='out',
+                                 desc='CFD mesh edges used by more than two'
+                                      ' triangles.')
+    mesh_watertight = Bool(False, iotype='out',
+                           desc='CFD mesh has no boundary or non-manifold'
+                                ' edges.')
+    xsec_components = List(iotype='out',
+                           desc='HermiteComponent (name and cross-section'
+                                ' points) per component, if write_xsec.')
+    stl_table = Array(iotype='out',
+                      desc='Stereolith results per solid: name, area, volume,'
+                           ' centroid, bbox_min, bbox_max.')
+    stl_mesh = Instance(STLMesh, iotype='out',
+                        desc='Mesh from Stereolith file, if written and'
+                             ' load_stl is set.')
+    nascart_mesh = Instance(NascartMesh, iotype='out',
+                            desc='Mesh from bodyin.dat and bodyin.key, if'
+                                 ' written.')
+    cfd_stl_mesh = Instance(STLMesh, iotype='out',
+                            desc='Mesh from cfdmesh.stl, if generated and'
+                                 ' load_stl is set.')
+
+    def __init__(self, xml_filename, use_snapshots=False, snapshot_dir='',
+                 geometry=None):
         super(VSP, self).__init__()
         self.xml_filename = xml_filename
-        self.add('geometry', VSPGeometry())
+        self.use_snapshots = use_snapshots
+        self.snapshot_dir = snapshot_dir
+        # If `geometry` is supplied, the XML file is not read.
+        self._read_geometry = geometry is None
+        if geometry is None:
+            geometry = VSPGeometry()
+        self.add('geometry', geometry)
         self._etree = None
+        self._cache = None
+        self._last_signature = None
+        self._param_index = None
+        self._selections = {}
+        self._selected = None
+        self._comp_geom_index = {}
+        # Additional LogMatcher objects applied to VSP output.
+        self.log_matchers = []
 
     def configure(self):
         """ If specified, read XML file. """
@@ -61,34 +212,237 @@ class VSP(ExternalCode):
         self.external_files = []
 
         if self.xml_filename:
-            self.read_input(self.xml_filename)
+            if self._read_geometry:
+                self.read_input(self.xml_filename)
             self.external_files.append(
                  FileMetadata(path=self.xml_filename, input=True,
                               desc='VSP XML file.'))
 
+    def clone(self):
+        """
+        Returns a new component with the same inputs and a clone of this
+        geometry (see :meth:`VSPGeometry.clone`).
+        """
+        clone = VSP(self.xml_filename, geometry=self.geometry.clone())
+        for name, obj in self.items(iotype='in'):
+            if not isinstance(obj, Container):
+                setattr(clone, name, obj)
+        clone.log_matchers = list(self.log_matchers)
+        return clone
+
+    def get_vector(self, names=None):
+        """
+        Returns array of numeric XML parameter values. `names` is a list of
+        paths (``'geometry.Wing.wing_parms.sweep'``) and/or shell-style
+        patterns (``'geometry.*.wing_parms.sweep'``), or a single pattern.
+        The selection is remembered for subsequent calls which don't
+        specify `names`.
+        """
+        return get_values(self._select(names))
+
+    def set_vector(self, values, names=None):
+        """ Set numeric XML parameters from `values` (see :meth:`get_vector`). """
+        try:
+            set_values(self._select(names), values)
+        except ValueError as exc:
+            self.raise_exception(str(exc), ValueError)
+
+    def get_bounds(self, names=None):
+        """
+        Returns ``(low, high)`` arrays of bounds for numeric XML parameters
+        (see :meth:`get_vector`). Unbounded values are +/- infinity.
+        """
+        return get_bounds(self._select(names))
+
+    def vector_names(self, names=None):
+        """ Returns paths of selected parameters (see :meth:`get_vector`). """
+        return [entry.path for entry in self._select(names)]
+
+    def _select(self, names):
+        """ Returns list of parameter index entries selected by `names`. """
+        index = self._param_index
+        if index is None or not index.is_current(self.geometry):
+            index = ParameterIndex(self.geometry)
+            self._param_index = index
+            self._selections = {}
+
+        if names is None:
+            names = self._selected
+            if names is None:
+                self.raise_exception('No parameters selected', ValueError)
+        elif not isinstance(names, basestring):
+            names = tuple(names)
+
+        entries = self._selections.get(names)
+        if entries is None:
+            try:
+                entries = index.select(names)
+            except KeyError as exc:
+                self.raise_exception(exc.args[0], KeyError)
+            self._selections[names] = entries
+        self._selected = names  # Only once resolved.
+        return entries
+
     def execute(self):
         """ Execute VSP to perform one or more operations. """
+        if self.resources:  # Let ExternalCode handle remote execution.
+            signature = self._signature()
+            if self._unchanged(signature):
+                return
+            self._last_signature = None
+            run = self._setup_run()
+            try:
+                with _chdir(run.run_dir):
+                    if not self._fetch_cached(run):
+                        super(VSP, self).execute()
+                    self._read_results(run)
+            finally:
+                self._cleanup_run(run)
+            self._last_signature = signature
+            return
+
+        # Run locally, watching output for problems.
+        run = self.start_execute()
+        poll_delay = self.poll_delay if self.poll_delay > 0 else 0.1
+        try:
+            while run.poll() is None:
+                time.sleep(poll_delay)
+        except BaseException:
+            if run.process is not None:
+                run.process.terminate()
+                run.process.close_files()
+            self._process = None
+            self._cleanup_run(run)
+            raise
+        self.finish_execute(run)
+
+    def start_execute(self):
+        """
+        Start VSP without waiting for it to complete.
+        Returns a :class:`VSPRun` to pass to :meth:`finish_execute` once its
+        :meth:`VSPRun.poll` returns non-None. This allows many VSP runs to be
+        driven from a single thread (see :func:`run_concurrently`).
+        Note that this bypasses the normal component :meth:`run` processing.
+        """
+        self._stop = False
+        signature = self._signature()
+        if self._unchanged(signature):
+            run = VSPRun(None, None, None, None, [])
+            run.skipped = True
+            return run
+        self._last_signature = None
+
+        with self.dir_context:
+            run = self._setup_run()
+            run.signature = signature
+            try:
+                with _chdir(run.run_dir):
+                    if not self._fetch_cached(run):
+                        self._logger.info('executing %s...', self.command)
+                        self.timed_out = False
+                        run.timeout = self.timeout
+                        run.start_time = time.time()
+                        run.process = ShellProc(self.command, self.stdin,
+                                                self.stdout, self.stderr,
+                                                self.env_vars)
+                        self._process = run.process  # For stop().
+            except Exception:
+                self._cleanup_run(run)
+                raise
+        return run
+
+    def finish_execute(self, run):
+        """ Read results from completed `run` (see :meth:`start_execute`). """
+        if run.poll() is None:
+            self.raise_exception('VSP is still running', RuntimeError)
+        if run.skipped:  # Previous results are still valid.
+            return
+
+        with self.dir_context:
+            try:
+                if run.process is not None:
+                    if self._process is run.process:
+                        self._process = None
+                    run.process.close_files()
+                    if self._stop:
+                        self.return_code = run.process.poll()
+                        self.raise_exception('Run stopped', RunStopped)
+                    if run.timed_out:
+                        self.timed_out = True
+                        self.return_code = -999999
+                        self.raise_exception('Timed out', RunInterrupted)
+                    if run.abort_reason:
+                        self.return_code = -999999
+                        self.raise_exception('VSP aborted: %s'
+                                             % run.abort_reason, RuntimeError)
+                    self.return_code = run.process.poll()
+                    if self.return_code:
+                        self.raise_exception('return_code = %d'
+                                             % self.return_code, RuntimeError)
+                with _chdir(run.run_dir):
+                    self._read_results(run)
+            finally:
+                self._cleanup_run(run)
+        self._last_signature = run.signature
+
+    def _signature(self):
+        """
+        Returns hash of all inputs which may affect results, including the
+        contents of files referenced by the model, or None if
+        `skip_cosmetic` is False. Display parameters are ignored, as are
+        CFD mesh parameters when not generating a CFD mesh.
+        """
+        if not self.skip_cosmetic:
+            return None
+        ignore = ['display']
+        if not self.generate_cfd_mesh:
+            ignore.append('cfd_mesh')
+        sha = hashlib.sha1()
+        for name, obj in sorted(self.items(iotype='in'), key=lambda x: x[0]):
+            if not isinstance(obj, Container):
+                sha.update('\n%s=%r' % (name, obj))
+        self.geometry.update_signature(sha, ignore)
+        with self.dir_context:
+            update_file_hashes(sha, [os.path.abspath(path) for path in
+                                     self.geometry.input_files()])
+        return sha.hexdigest()
+
+    def _unchanged(self, signature):
+        """ Returns True if VSP need not be run for `signature`. """
+        if signature is None or signature != self._last_signature:
+            return False
+        self._logger.debug('Only display parameters changed, not running VSP')
+        return True
+
+    def _setup_run(self):
+        """
+        Determine command line and output files, then write the XML input
+        file and stage any referenced files in the run directory.
+        Returns :class:`VSPRun`.
+        """
         if self.generate_cfd_mesh and self.write_nascart:
             self.raise_exception('CFD meshing and NASCART output use the same'
                                  ' output filenames', RuntimeError)
 
-        if not os.path.isfile(self.vsp_path) and find_in_path(self.vsp_path) is None:
+        if os.path.isfile(self.vsp_path):
+            vsp_path = os.path.abspath(self.vsp_path)
+        elif find_in_path(self.vsp_path) is not None:
+            vsp_path = self.vsp_path
+        else:
             raise RuntimeError("VSP executable '%s' not found" % self.vsp_path)
 
-        # Write XML input file.
         filename = os.path.basename(self.xml_filename)
         if filename.endswith('.vsp'):
             base_filename = filename[:-4]
         else:  # .xml input files leave the .new in the output filenames ????
             base_filename = filename + '.new'
         filename += '.new'
-        self.write_input(filename)
 
         # Determine command line and output files.
-        cmd = [self.vsp_path, '-batch', filename]
+        cmd = [vsp_path, '-batch', filename]
         output_files = []
 
-        if self.comp_geom:
+        if self.comp_geom and not self.stereo_analysis:
             cmd.append('-compgeom')
             output_files.extend((base_filename + '_CompGeom.txt', base_filename + '_CompGeom.csv'))
 
@@ -99,6 +453,7 @@ class VSP(ExternalCode):
         if self.slice:
             cmd.extend(['-slice', str(self.num_slices),
                         str(self.mach), str(self.cone_sections)])
+            output_files.append('%s_Slice.txt' % base_filename)
 
         if self.write_xsec:
             cmd.append('-xsec')
@@ -109,7 +464,7 @@ class VSP(ExternalCode):
             for ext in ('fel', 'bsf', 'bac'):
                 output_files.append('%s.%s' % (base_filename, ext))
 
-        if self.write_stereo:
+        if self.write_stereo or self.stereo_analysis:
             cmd.append('-stereo')
             output_files.append('%s.stl' % base_filename)
 
@@ -127,70 +482,433 @@ class VSP(ExternalCode):
         if self.write_stecplot:
             cmd.append('-stecplot')
 
-        for name in output_files:
-            if os.path.exists(name):
-                os.remove(name)
-
-        # Run VSP.
         self.command = cmd
         self.stdout = os.path.basename(self.xml_filename)+'.log'
         self.stderr = ExternalCode.STDOUT
-        super(VSP, self).execute()
-
-        # Read from -compgeom output.
-        if self.comp_geom:
-            reader = csv.reader(open(base_filename + '_CompGeom.csv', 'r'))
-            next(reader)
-            row = []
-            wet_areas = {'Horizontal_Tail':0, 'Vertical_Tail':0, 'Wing':0, 'Fuselage':0}
-            for row in reader:
-                if row[0] in wet_areas:
-                    wet_areas[row[0]] = wet_areas.get(row[0]) + float(row[2])
-            self.horiz_wet_area = wet_areas.get('Horizontal_Tail')
-            self.vert_wet_area = wet_areas.get('Vertical_Tail')
-            self.wing_wet_area = wet_areas.get('Wing')
-            self.fuse_wet_area = wet_areas.get('Fuselage')
-            if len(row) == 5:
-                self.theoretical_area = float(row[1])
-                self.wetted_area = float(row[2])
-                self.theoretical_volume = float(row[3])
-                self.wetted_volume = float(row[4])
+
+        # Run in a private scratch directory or in our own directory.
+        work_dir = os.getcwd()
+        if self.scratch_dirs:
+            run_dir = tempfile.mkdtemp(prefix='vsp-', dir=work_dir)
+        else:
+            run_dir = work_dir
+            for name in output_files:
+                if os.path.exists(name):
+                    os.remove(name)
+
+        run = VSPRun(work_dir, run_dir, filename, base_filename, output_files)
+        run.monitor = self._make_monitor(os.path.join(run_dir, self.stdout))
+        try:
+            if run_dir == work_dir:
+                self.write_input(os.path.join(run_dir, filename))
             else:
-                self.raise_exception('comp_geom.csv invalid', RuntimeError)
+                self.write_input(os.path.join(run_dir, filename), work_dir)
+                self._stage_inputs(work_dir, run_dir)
+            run.listing = _listing(run_dir)
+        except Exception:
+            self._cleanup_run(run)
+            raise
+        return run
+
+    def _make_monitor(self, filename):
+        """ Return :class:`LogMonitor` for VSP output in `filename`. """
+        matchers = [PatternMatcher('xmlGetNode: Cant find',
+                                   logger=self._logger)]
+        for pattern in self.fatal_patterns:
+            matchers.append(PatternMatcher(pattern, fatal=True))
+        if self.generate_cfd_mesh:
+            matchers.append(RequiredMatcher('Total Num Tris', 'Meshing failed'))
+            if self.max_mesh_tris:
+                matchers.append(TriangleBudget(self.max_mesh_tris))
+            if self.max_mesh_time:
+                matchers.append(TimeBudget(self.max_mesh_time))
+        matchers.extend(self.log_matchers)
+        return LogMonitor(filename, matchers)
+
+    def _stage_inputs(self, work_dir, run_dir):
+        """
+        Make files referenced by the model available in `run_dir`.
+        Absolute paths are left alone, VSP can find those from anywhere.
+        Paths starting with '..' are written as absolute paths by
+        :meth:`write_input`.
+        """
+        for path in self.geometry.input_files():
+            if os.path.isabs(path) or path.startswith(os.pardir):
+                continue
+            src = os.path.join(work_dir, path)
+            if not os.path.isfile(src):
+                continue
+            dst = os.path.join(run_dir, path)
+            dst_dir = os.path.dirname(dst)
+            if not os.path.isdir(dst_dir):
+                os.makedirs(dst_dir)
+            if not os.path.exists(dst):
+                shutil.copyfile(src, dst)
+
+    def _fetch_cached(self, run):
+        """
+        Returns True if results for `run` were found in the cache.
+        Otherwise `run` records where to cache its results.
+        """
+        cache = self._get_cache()
+        if cache is None:
+            return False
+
+        input_files = [os.path.join(run.work_dir, path)
+                       for path in self.geometry.input_files()]
+        key = cache.make_key(run.filename, self.command, input_files)
+        if cache.fetch(key, os.getcwd()) is None:
+            run.cache_key = key
+            return False
+
+        self._logger.debug('Using cached results %s', key)
+        self.return_code = 0
+        self.timed_out = False
+        return True
+
+    def _read_results(self, run):
+        """ Read results from VSP output files in the current directory. """
+        base_filename = run.base_filename
+
+        # Anything else VSP wrote, such as Tecplot files, is also output.
+        known = set(run.output_files + [run.filename, self.stdout])
+        for name, stat in sorted(_listing(os.getcwd()).items()):
+            if name not in known and run.listing.get(name) != stat:
+                run.output_files.append(name)
+
+        # Areas and volumes, from -stereo or -compgeom output.
+        self.stl_table = numpy.zeros(0)
+        if self.stereo_analysis:
+            self._stereo_results(base_filename)
+        elif self.comp_geom:
+            table, totals = self._read_output('comp_geom.csv', read_comp_geom,
+                                              base_filename + '_CompGeom.csv')
+            self.comp_geom_table = table
+            self._comp_geom_index = index_names(table)
+            self.horiz_wet_area = self._wet_area('Horizontal_Tail')
+            self.vert_wet_area = self._wet_area('Vertical_Tail')
+            self.wing_wet_area = self._wet_area('Wing')
+            self.fuse_wet_area = self._wet_area('Fuselage')
+            self.theoretical_area, self.wetted_area, \
+                self.theoretical_volume, self.wetted_volume = totals
         else:
+            self.comp_geom_table = empty_table()
+            self._comp_geom_index = {}
             self.theoretical_area = 0
             self.wetted_area = 0
             self.theoretical_volume = 0
             self.wetted_volume = 0
 
-        # Check CFD meshing if requested.
+        # Check remaining output (all of it if results were cached).
+        error = run.monitor.finish()
+        if error:
+            self.raise_exception(error, RuntimeError)
+
+        # Read area slices. The results file name and layout haven't been
+        # verified against VSP output, so problems are only warned about.
+        slices = None
+        if self.slice:
+            slice_file = '%s_Slice.txt' % base_filename
+            if not os.path.exists(slice_file):
+                self._logger.warning('slice output not found: %s', slice_file)
+            else:
+                try:
+                    slices = read_slices(slice_file)
+                except ValueError as exc:
+                    self._logger.warning('slice output invalid: %s', exc)
+        if slices is not None:
+            self.slice_angles, self.slice_x, self.slice_area = slices
+            self.slice_max_area, self.slice_smoothness, self.slice_d2_max = \
+                area_rule(self.slice_x, self.slice_area)
+        else:
+            empty = numpy.zeros(0)
+            self.slice_angles = empty
+            self.slice_x = empty.reshape((0, 0))
+            self.slice_area = empty.reshape((0, 0))
+            self.slice_max_area = empty
+            self.slice_smoothness = empty
+            self.slice_d2_max = empty
+
+        # Read cross sections.
+        if self.write_xsec:
+            self.xsec_components = self._read_output(
+                'Hermite file', read_hermite, '%s.hrm' % base_filename)
+        else:
+            self.xsec_components = []
+
+        # Load STL meshes, check CFD mesh quality.
+        if not self.stereo_analysis:
+            self.stl_mesh = None
+        self.cfd_stl_mesh = None
+        if self.load_stl and self.write_stereo and not self.stereo_analysis:
+            self.stl_mesh = self._read_output('STL file', read_stl,
+                                              base_filename + '.stl',
+                                              self.stl_tolerance)
         if self.generate_cfd_mesh:
-            mesh_ok = False
-
-        with open(self.stdout, 'r') as out:
-            for line in out:
-                if 'xmlGetNode: Cant find' in line:
-                    self._logger.warning(line[:-1])
-                if self.generate_cfd_mesh:
-                    if 'Total Num Tris' in line:
-                        mesh_ok = True
-        if self.generate_cfd_mesh and not mesh_ok:
-            self.raise_exception('Meshing failed', RuntimeError)
+            mesh = self._read_output('CFD mesh', read_stl, 'cfdmesh.stl',
+                                     self.stl_tolerance)
+            if self.load_stl:
+                self.cfd_stl_mesh = mesh
+            self._check_mesh(mesh)
+
+        # Load NASCART mesh.
+        if self.write_nascart or self.generate_cfd_mesh:
+            self.nascart_mesh = self._read_output('NASCART file', read_nascart,
+                                                  'bodyin.dat', 'bodyin.key')
+        else:
+            self.nascart_mesh = None
+
+        # Results are good, save for next time.
+        if run.cache_key is not None:
+            self._get_cache().store(run.cache_key, os.getcwd(),
+                                    run.output_files + [self.stdout])
+
+    def _read_output(self, what, reader, *args):
+        """
+        Returns ``reader(*args)``, reporting a missing or invalid output
+        file (described by `what`) as an error of this component.
+        """
+        try:
+            return reader(*args)
+        except (IOError, ValueError) as exc:
+            self.raise_exception('%s invalid: %s' % (what, exc), RuntimeError)
+
+    def _check_mesh(self, mesh):
+        """ Set CFD mesh quality outputs, reject if unacceptable. """
+        quality = mesh_quality(mesh.vertices, mesh.faces)
+        self.mesh_num_tris = quality.num_tris
+        self.mesh_edge_min = quality.edge_min
+        self.mesh_edge_max = quality.edge_max
+        self.mesh_edge_mean = quality.edge_mean
+        self.mesh_aspect_max = quality.aspect_max
+        self.mesh_aspect_hist = quality.aspect_hist
+        self.mesh_skewness_max = quality.skewness_max
+        self.mesh_skewness_hist = quality.skewness_hist
+        self.mesh_boundary_edges = quality.boundary_edges
+        self.mesh_nonmanifold_edges = quality.nonmanifold_edges
+        self.mesh_watertight = quality.watertight
+
+        problems = []
+        if not quality.num_tris:
+            problems.append('no triangles')
+        if self.max_mesh_aspect and quality.aspect_max > self.max_mesh_aspect:
+            problems.append('aspect ratio %g > %g'
+                            % (quality.aspect_max, self.max_mesh_aspect))
+        if self.max_mesh_skewness and \
+           quality.skewness_max > self.max_mesh_skewness:
+            problems.append('skewness %g > %g'
+                            % (quality.skewness_max, self.max_mesh_skewness))
+        if self.min_mesh_edge and quality.edge_min < self.min_mesh_edge:
+            problems.append('edge length %g < %g'
+                            % (quality.edge_min, self.min_mesh_edge))
+        if self.require_watertight and not quality.watertight:
+            problems.append('%d boundary and %d non-manifold edges'
+                            % (quality.boundary_edges,
+                               quality.nonmanifold_edges))
+        if problems:
+            self.raise_exception('CFD mesh rejected: %s' % ', '.join(problems),
+                                 RuntimeError)
+
+    def _stereo_results(self, base_filename):
+        """
+        Set theoretical areas and volumes from Stereolith output. There is
+        no intersection, so wetted values and CompGeom results are zero.
+        """
+        self.stl_mesh = self._read_output('STL file', read_stl,
+                                          base_filename + '.stl',
+                                          self.stl_tolerance)
+        table = solid_properties(self.stl_mesh)
+        self.stl_table = table
+        self.comp_geom_table = empty_table()
+        self._comp_geom_index = {}
+        self.horiz_wet_area = 0
+        self.vert_wet_area = 0
+        self.wing_wet_area = 0
+        self.fuse_wet_area = 0
+        self.theoretical_area = float(table['area'].sum())
+        self.wetted_area = 0
+        self.theoretical_volume = float(table['volume'].sum())
+        self.wetted_volume = 0
+
+    def get_comp_geom(self, name):
+        """
+        Returns rows of :attr:`comp_geom_table` for parts named `name`.
+        Raises KeyError if there are none.
+        """
+        try:
+            return self.comp_geom_table[self._comp_geom_index[name]]
+        except KeyError:
+            raise KeyError('%r not in CompGeom results' % name)
+
+    def _wet_area(self, name):
+        """ Returns total wetted area of parts named `name`. """
+        indices = self._comp_geom_index.get(name)
+        if indices is None:
+            return 0.
+        return float(self.comp_geom_table['wetted_area'][indices].sum())
+
+    def _cleanup_run(self, run):
+        """ Move results out of scratch directory and remove it. """
+        if run.monitor is not None:
+            run.monitor.close()
+        if run.run_dir == run.work_dir:
+            return
+        for name in [run.filename, self.stdout] + run.output_files:
+            path = os.path.join(run.run_dir, name)
+            if os.path.exists(path):
+                _replace(path, os.path.join(run.work_dir, name))
+        shutil.rmtree(run.run_dir, ignore_errors=True)
+
+    def _get_cache(self):
+        """ Return result cache to use, or None. """
+        if not self.cache_dir:
+            return None
+        max_size = self.cache_size * 1024 * 1024
+        path = os.path.abspath(self.cache_dir)
+        if self._cache is None or self._cache.directory != path:
+            self._cache = ResultCache(path, max_size)
+        self._cache.max_size = max_size
+        return self._cache
 
     def read_input(self, filename=None):
-        """ Read XML file. """
+        """ Read XML file, or its snapshot if `use_snapshots` is set. """
         filename = filename or self.xml_filename
         with self.dir_context:
-            self._etree = ElementTree.parse(filename)
-            self.geometry.read(self._etree.getroot())
-
-    def write_input(self, filename=None):
-        """ Write XML file. """
-        root = self.geometry.write(None)
-        etree = ElementTree.ElementTree(root)
+            if self.use_snapshots:
+                geometry = load_snapshot(filename, self.snapshot_dir)
+                if geometry is None:
+                    self._logger.debug('Saving snapshot of %s', filename)
+                    self._etree = ElementTree.parse(filename)
+                    geometry = VSPGeometry()
+                    geometry.read(self._etree.getroot())
+                    save_snapshot(geometry, filename, self.snapshot_dir)
+                self.remove('geometry')
+                self.add('geometry', geometry)
+            else:
+                self._etree = ElementTree.parse(filename)
+                self.geometry.read(self._etree.getroot())
+        self._last_signature = None
+
+    def write_input(self, filename=None, base_dir=None):
+        """
+        Write XML file. If `base_dir` is specified, referenced files with
+        relative paths leading out of it (starting with '..') are written
+        as absolute paths, for running in a directory below `base_dir`.
+        """
+        text = self.geometry.write_text()
+        if base_dir:
+            for path in self.geometry.input_files():
+                if path.startswith(os.pardir):
+                    abspath = os.path.normpath(os.path.join(base_dir, path))
+                    text = text.replace('>%s<' % escape(path),
+                                        '>%s<' % escape(abspath))
         filename = filename or self.xml_filename
         with self.dir_context:
             with open(filename, 'w') as out:
                 out.write('<?xml version="1.0"?>\n')
-                etree.write(out)
-
+                out.write(text)
+
+
+class VSPRun(object):
+    """ State of one VSP run started by :meth:`VSP.start_execute`. """
+
+    def __init__(self, work_dir, run_dir, filename, base_filename,
+                 output_files):
+        self.work_dir = work_dir
+        self.run_dir = run_dir
+        self.filename = filename
+        self.base_filename = base_filename
+        self.output_files = output_files
+        self.cache_key = None
+        self.listing = {}  # Files in run_dir before running VSP.
+        self.signature = None
+        self.skipped = False
+        self.monitor = None
+        self.abort_reason = None
+        self.process = None
+        self.timeout = 0.
+        self.timed_out = False
+        self.start_time = time.time()
+
+    def poll(self):
+        """
+        Returns None while VSP is running, else its return code.
+        VSP is killed if it has exceeded its timeout or if its output
+        monitor requests an abort.
+        """
+        if self.process is None:  # Results were cached or run was skipped.
+            return 0
+        return_code = self.process.poll()
+        if return_code is None and not (self.timed_out or self.abort_reason):
+            elapsed = time.time() - self.start_time
+            if self.timeout > 0 and elapsed > self.timeout:
+                self.timed_out = True
+            elif self.monitor is not None:
+                self.abort_reason = self.monitor.poll(elapsed)
+            if self.timed_out or self.abort_reason:
+                self.process.terminate()
+        return return_code
+
+
+def run_concurrently(components, max_running=0, poll_delay=0.05):
+    """
+    Run VSP `components` from this thread, with up to `max_running` VSP
+    processes at once (zero implies no limit). Returns a list holding
+    None for each component that succeeded, else the exception raised.
+    """
+    errors = [None] * len(components)
+    pending = list(enumerate(components))
+    running = []
+    while pending or running:
+        while pending and (max_running <= 0 or len(running) < max_running):
+            i, comp = pending.pop(0)
+            try:
+                running.append((i, comp, comp.start_execute()))
+            except Exception as exc:
+                errors[i] = exc
+
+        still_running = []
+        for i, comp, run in running:
+            if run.poll() is None:
+                still_running.append((i, comp, run))
+            else:
+                try:
+                    comp.finish_execute(run)
+                except Exception as exc:
+                    errors[i] = exc
+        if still_running and len(still_running) == len(running):
+            time.sleep(poll_delay)
+        running = still_running
+    return errors
+
+
+@contextmanager
+def _chdir(path):
+    """ Temporarily change current directory to `path`. """
+    orig = os.getcwd()
+    os.chdir(path)
+    try:
+        yield path
+    finally:
+        os.chdir(orig)
+
+
+def _listing(directory):
+    """ Returns dictionary of (mtime, size) by name of files in `directory`. """
+    listing = {}
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if os.path.isfile(path):
+            info = os.stat(path)
+            listing[name] = (info.st_mtime, info.st_size)
+    return listing
+
+
+def _replace(src, dst):
+    """ Move file `src` to `dst`, replacing any existing `dst`. """
+    try:
+        os.rename(src, dst)
+    except OSError:  # Windows won't rename onto an existing file.
+        if os.path.exists(dst):
+            os.remove(dst)
+        os.rename(src, dst)
@@ -1,6 +1,8 @@
 import string
 import xml.etree.cElementTree as ElementTree
 
+import numpy
+
 from traits.trait_base import not_none
 
 from openmdao.main.api import Container
@@ -8,66 +10,511 @@ from openmdao.main.api import Container
 # Used for making a legal OpenMDAO container name from a VSP component name.
 XLATE = string.maketrans(' -.', '___')
 
+# Codec tables for XMLContainer classes, see XMLContainer.get_codecs().
+_CLASS_CODECS = {}
+
+# Signature tables for XMLContainer classes, see
+# XMLContainer.get_signature_table().
+_CLASS_SIGNATURES = {}
+
+# Point list codecs, by values per point.
+_POINTS_CODECS = {}
+
 
 class XMLContainer(Container):
     """
     A container for XML parameters. XML parameters are designated by an
     `xmltag` metadata item in a trait.
+
+    Parameters are classified by what VSP results they can affect.
+    A trait's `affects` metadata item overrides the class `AFFECTS`:
+    None (the default) for anything, 'cfd_mesh' for CFD meshing only, or
+    'display' for nothing (colors, textures, viewing parameters).
+
+    Leaf elements which are neither parameters nor listed in `XML_HANDLED`
+    (tags a subclass reads itself) are kept and written back unchanged.
+
+    :meth:`write_tree` keeps the tree it writes. Parameter changes are
+    tracked, and subsequent calls just update the corresponding text.
+    Any other change to the container structure causes a full rewrite.
     """
 
+    AFFECTS = None
+    XML_HANDLED = ()
+
+    # Kept tree (if any) and its elements for our parameters.
+    _tree = None
+    _nodes = None
+
+    # Incremented whenever containers or traits are added or removed here
+    # or below here.
+    _generation = 0
+
     def __init__(self, xmltag):
         super(XMLContainer, self).__init__()
         self._xmltag = xmltag
+        self._codecs = None  # Codec table, see get_codecs().
+        self._signature_table = None  # See get_signature_table().
+        self._unknown = []   # (tag, text) of unrecognized leaf elements.
+        self._changed = set()
+
+    def __getstate__(self):
+        """ Return dict representing this container's state. """
+        state = dict(super(XMLContainer, self).__getstate__())
+        # Kept tree (and its elements) isn't picklable, codecs are rebuilt.
+        state['_tree'] = None
+        state['_nodes'] = None
+        state['_changed'] = set()
+        state['_codecs'] = None
+        state['_signature_table'] = None
+        return state
+
+    def _anytrait_changed(self, name, old, new):
+        """ Track changes affecting a kept XML tree. """
+        handler = getattr(super(XMLContainer, self), '_anytrait_changed', None)
+        if handler is not None:
+            handler(name, old, new)
+
+        tree = self._tree
+        if tree is None or name.startswith('_'):
+            return
+        if name in self._nodes:
+            self._changed.add(name)
+            tree.dirty.add(self)
+            tree.changes += 1
+        else:
+            trait = self.trait(name)
+            if trait is not None and trait.iotype == 'out' and \
+               trait.xmltag is None:
+                return  # Computed output, not written.
+            tree.valid = False
+
+    def add(self, name, obj):
+        """ Add `obj` as `name`, noting the structure change. """
+        self._structure_changed()
+        return super(XMLContainer, self).add(name, obj)
+
+    def remove(self, name):
+        """ Remove `name`, noting the structure change. """
+        self._structure_changed()
+        return super(XMLContainer, self).remove(name)
+
+    def add_trait(self, name, trait, *args, **kwargs):
+        """ Add trait, updating the codec table for this instance. """
+        super(XMLContainer, self).add_trait(name, trait, *args, **kwargs)
+        self._update_codecs(name)
+        self._structure_changed()
+
+    def remove_trait(self, name):
+        """ Remove trait, updating the codec table for this instance. """
+        super(XMLContainer, self).remove_trait(name)
+        self._update_codecs(name)
+        self._structure_changed()
+
+    def _update_codecs(self, name):
+        """
+        Make this instance's codec table (if built) reflect trait `name`,
+        without rebuilding it. The class table is never modified.
+        """
+        self._instance_codecs = True
+        self._signature_table = None
+        codecs = getattr(self, '_codecs', None)
+        if codecs is None:
+            return
+        codecs = [codec for codec in codecs if codec[0] != name]
+        trait = self.trait(name)
+        if trait is not None and trait.xmltag is not None:
+            codecs.append(self._make_codec(name, trait))
+            codecs.sort(key=lambda codec: codec[0])
+        self._codecs = codecs
+
+    def _structure_changed(self):
+        """
+        Invalidate any kept XML tree and increment the generation of this
+        container and all XMLContainers above it.
+        """
+        self._invalidate_tree()
+        obj = self
+        while isinstance(obj, XMLContainer):
+            obj._generation += 1
+            obj = obj.parent
+
+    def _invalidate_tree(self):
+        """ Force full rewrite on next :meth:`write_tree`. """
+        if self._tree is not None:
+            self._tree.valid = False
+
+    def get_codecs(self):
+        """
+        Returns list of ``(name, xmltag, default, from_text, to_text)``
+        for XML parameters, sorted by name. The list is built once per class,
+        unless traits have been added to or removed from this instance.
+        """
+        if self._codecs is None:
+            if getattr(self, '_instance_codecs', False):
+                self._codecs = self._make_codecs(self.traits(xmltag=not_none))
+            else:
+                cls = self.__class__
+                try:
+                    self._codecs = _CLASS_CODECS[cls]
+                except KeyError:
+                    codecs = self._make_codecs(
+                                 cls.class_traits(xmltag=not_none))
+                    _CLASS_CODECS[cls] = codecs
+                    self._codecs = codecs
+        return self._codecs
+
+    def get_signature_table(self):
+        """
+        Returns list of ``(name, affects)`` for XML parameters and other
+        inputs, sorted by name, where `affects` is the trait's classification
+        or the class `AFFECTS`. Like :meth:`get_codecs`, the list is built
+        once per class unless this instance has its own traits.
+        """
+        if self._signature_table is None:
+            if getattr(self, '_instance_codecs', False):
+                self._signature_table = \
+                    self._make_signature_table(self.traits())
+            else:
+                cls = self.__class__
+                try:
+                    self._signature_table = _CLASS_SIGNATURES[cls]
+                except KeyError:
+                    table = self._make_signature_table(cls.class_traits())
+                    _CLASS_SIGNATURES[cls] = table
+                    self._signature_table = table
+        return self._signature_table
+
+    def _make_signature_table(self, traits):
+        """ Returns sorted signature table given all `traits`. """
+        names = set([codec[0] for codec in self.get_codecs()])
+        names.update([name for name, trait in traits.items()
+                      if trait.iotype == 'in'])
+        return [(name, traits[name].affects or self.AFFECTS)
+                for name in sorted(names)]
+
+    def get_codec(self, name):
+        """ Returns codec for XML parameter `name` from :meth:`get_codecs`. """
+        for codec in self.get_codecs():
+            if codec[0] == name:
+                return codec
+        self.raise_exception('%s is not an XML parameter' % name, KeyError)
+
+    def _make_codecs(self, traits):
+        """ Returns sorted codec table for `traits` (name => trait). """
+        return [self._make_codec(name, trait)
+                for name, trait in sorted(traits.items(), key=lambda x: x[0])]
+
+    def _make_codec(self, name, trait):
+        """ Returns codec for `trait`, based on the type of its default. """
+        default = trait.default
+        if isinstance(default, numpy.ndarray):
+            from_text, to_text = _points_codec(trait.group or 1)
+            return (name, trait.xmltag, default, from_text, to_text)
+        elif isinstance(default, bool):
+            return (name, trait.xmltag, default, _bool_from_text, _bool_to_text)
+        elif isinstance(default, float):
+            return (name, trait.xmltag, default, float, str)
+        elif isinstance(default, int):
+            return (name, trait.xmltag, default, int, str)
+        elif isinstance(default, basestring):
+            return (name, trait.xmltag, default, _str_from_text, str)
+        else:
+            self.raise_exception('%s is of an unsupported type %s'
+                                 % (name, type(default)), TypeError)
 
     def read(self, this):
         """ Read parameters from XML tree element `this`. """
-        for name, obj in self.items(xmltag=not_none):
-            self.read_element(this, name, obj)
+        # Single pass over children, first occurrence of a tag wins.
+        texts = {}
+        leaves = []
+        for child in this:
+            tag = child.tag
+            text = child.text or ''
+            if tag not in texts:
+                texts[tag] = text
+            if len(child) == 0 and text.strip():
+                leaves.append((tag, text))
+
+        known = set(self.XML_HANDLED)
+        for name, xmltag, default, from_text, to_text in self.get_codecs():
+            setattr(self, name, from_text(texts.get(xmltag, default)))
+            known.add(xmltag)
+
+        self._unknown = [leaf for leaf in leaves if leaf[0] not in known]
+        if self._unknown:
+            self._logger.debug('keeping %d unknown elements: %s',
+                               len(self._unknown),
+                               ', '.join([leaf[0] for leaf in self._unknown]))
 
     def read_element(self, this, name, obj=None):
         """ Read one parameter from XML tree element `this`. """
-        if obj is None:
-            obj = getattr(self, name)
-        trait = self.trait(name)
-        text = this.findtext(trait.xmltag, trait.default)
-        if isinstance(obj, bool):
-            setattr(self, name, int(text) != 0)
-        elif isinstance(obj, float):
-            setattr(self, name, float(text))
-        elif isinstance(obj, int):
-            setattr(self, name, int(text))
-        elif isinstance(obj, str):
-            setattr(self, name, text)
-        else:
-            self.raise_exception('%s is of an unsupported type %s'
-                                 % (name, type(obj)), TypeError)
+        name, xmltag, default, from_text, to_text = self.get_codec(name)
+        setattr(self, name, from_text(this.findtext(xmltag, default)))
+        self._unknown = [leaf for leaf in self._unknown if leaf[0] != xmltag]
+
+    def unknown_tags(self):
+        """ Returns tags of unrecognized elements kept from last read. """
+        return [leaf[0] for leaf in self._unknown]
 
     def write(self, parent, nesting=0):
         """
         Write parameters to XML tree under `parent`.
         Returns tree element.
         """
+        # A new tree replaces any kept one.
+        self._invalidate_tree()
+        self._tree = None
+        self._changed.clear()
+
         this = ElementTree.Element(self._xmltag)
         this.text = self.tail(nesting+1)
         this.tail = self.tail(nesting)
-        for name, obj in sorted(self.items(xmltag=not_none),
-                                key=lambda x: x[0]):
-            trait = self.trait(name)
-            child = ElementTree.Element(trait.xmltag)
-            if isinstance(obj, bool):
-                child.text = '1' if obj else '0'
-            else:
-                child.text = str(obj)
-            child.tail = self.tail(nesting+1)
-            this.append(child)
+        child_tail = this.text
+        nodes = {}
+        for name, xmltag, default, from_text, to_text in self.get_codecs():
+            child = ElementTree.SubElement(this, xmltag)
+            child.text = to_text(getattr(self, name))
+            child.tail = child_tail
+            nodes[name] = (child, to_text)
+        self._nodes = nodes
+        for tag, text in self._unknown:
+            child = ElementTree.SubElement(this, tag)
+            child.text = text
+            child.tail = child_tail
 
         if parent is not None:
             parent.append(this)
 
         return this
 
+    def write_tree(self):
+        """
+        Returns root element of XML tree for this container and those below
+        it. The tree is kept, subsequent calls only update the text of
+        parameters which have changed.
+        """
+        tree = self._kept_tree()
+        for container in tree.dirty:
+            container._update_tree()
+        tree.dirty.clear()
+        return tree.root
+
+    def write_text(self):
+        """
+        Returns serialized XML for this container and those below it,
+        identical to serializing :meth:`write` output with ElementTree.
+        The structure is compiled into a string template once (until the
+        structure changes), then each call just formats the current values.
+        """
+        tree = self._kept_tree()
+        if tree.template is None:
+            tree.template = self._compile_template(tree.root)
+        template, slots = tree.template
+        values = []
+        for container, name, to_text, start, end, empty in slots:
+            text = to_text(getattr(container, name))
+            if text:
+                values.append(start + _escape(text) + end)
+            else:
+                values.append(empty)
+        return template % tuple(values)
+
+    def _kept_tree(self):
+        """ Returns kept XML tree, building a new one if necessary. """
+        tree = self._tree
+        if tree is None or not tree.valid or tree.owner is not self:
+            tree = _XMLTree(self, self.write(None))
+            for container in self.xml_containers():
+                container._tree = tree
+        return tree
+
+    def _update_tree(self):
+        """ Update text of changed parameters in kept XML tree. """
+        for name in self._changed:
+            node, to_text = self._nodes[name]
+            node.text = to_text(getattr(self, name))
+        self._changed.clear()
+
+    def _compile_template(self, root):
+        """
+        Returns ``(template, slots)`` for tree `root`. `template` is the
+        serialized tree with a '%s' for each parameter element, `slots` is a
+        list of ``(container, name, to_text, start, end, empty)`` in document
+        order, where `empty` is the element written when there's no text.
+        """
+        # Serialize with numbered markers in place of parameter text.
+        slots = []
+        saved = []
+        for container in self.xml_containers():
+            for name, (node, to_text) in container._nodes.items():
+                saved.append((node, node.text))
+                node.text = '\x01%d\x01' % len(slots)
+                slots.append((container, name, to_text))
+        try:
+            parts = ElementTree.tostring(root).split('\x01')
+        finally:
+            for node, text in saved:
+                node.text = text
+
+        # Each slot covers the whole element, since an element without
+        # text is written as '<tag />'.
+        template = [parts[0]]
+        ordered = []
+        for i in range(1, len(parts), 2):
+            container, name, to_text = slots[int(parts[i])]
+            tag = container._nodes[name][0].tag
+            start = '<%s>' % tag
+            end = '</%s>' % tag
+            template[-1] = template[-1][:-len(start)]
+            template.append(parts[i+1][len(end):])
+            ordered.append((container, name, to_text, start, end,
+                            '<%s />' % tag))
+        template = [part.replace('%', '%%') for part in template]
+        return ('%s'.join(template), ordered)
+
+    def xml_containers(self):
+        """ Yield this container and all XMLContainers below it. """
+        yield self
+        for name in sorted(self.list_containers()):
+            obj = getattr(self, name)
+            if isinstance(obj, XMLContainer):
+                for container in obj.xml_containers():
+                    yield container
+
+    def update_signature(self, sha, ignore=()):
+        """
+        Update hash object `sha` with the inputs of this container and those
+        below it, skipping parameters classified in `ignore`.
+        """
+        self.update_parameter_signature(sha, ignore)
+        for name in sorted(self.list_containers()):
+            obj = getattr(self, name)
+            if isinstance(obj, XMLContainer):
+                sha.update('\n[%s]' % name)
+                obj.update_signature(sha, ignore)
+
+    def update_parameter_signature(self, sha, ignore=()):
+        """
+        Update hash object `sha` with the inputs of this container only:
+        all XML parameters and other inputs, skipping those classified in
+        `ignore`, kept unknown elements, and :meth:`update_signature_data`.
+        """
+        for name, affects in self.get_signature_table():
+            if affects in ignore:
+                continue
+            obj = getattr(self, name)
+            if isinstance(obj, Container):
+                continue
+            if isinstance(obj, numpy.ndarray):
+                # repr() elides the middle of large arrays.
+                sha.update('\n%s=%s' % (name, obj.shape))
+                sha.update(numpy.ascontiguousarray(obj, float).tostring())
+            else:
+                sha.update('\n%s=%r' % (name, obj))
+        if self._unknown and self.AFFECTS not in ignore:
+            sha.update('\n_unknown=%r' % (self._unknown,))
+        self.update_signature_data(sha)
+
+    def update_signature_data(self, sha):
+        """
+        Update hash object `sha` with data written to XML but not held in
+        traits. Subclasses with such data override this.
+        """
+        pass
+
     @staticmethod
     def tail(nesting=0):
         """ Return string to make XML tree dump more readable. """
         return '\n%s' % ('  ' * nesting)
 
+
+class _XMLTree(object):
+    """ XML tree kept by :meth:`XMLContainer.write_tree`. """
+
+    def __init__(self, owner, root):
+        self.owner = owner
+        self.root = root
+        self.valid = True
+        self.dirty = set()  # Containers with changed parameters.
+        self.changes = 0    # Count of parameter changes.
+        self.template = None
+
+
+def copy_element(element, shared=()):
+    """
+    Returns deep copy of `element`, except that elements whose id is in
+    `shared` are referenced rather than copied.
+    """
+    if id(element) in shared:
+        return element
+    copy = ElementTree.Element(element.tag, element.attrib)
+    copy.text = element.text
+    copy.tail = element.tail
+    for child in element:
+        copy.append(copy_element(child, shared))
+    return copy
+
+
+def _bool_from_text(text):
+    """ Returns bool for XML text (or default value). """
+    return int(text) != 0
+
+
+def _bool_to_text(obj):
+    """ Returns XML text for bool. """
+    return '1' if obj else '0'
+
+
+def _str_from_text(text):
+    """ Returns XML text unchanged. """
+    return text
+
+
+def _points_codec(group):
+    """
+    Returns ``(from_text, to_text)`` for a point list with `group` values
+    per point. Lists are written as VSP does: each value formatted ``%f``
+    and followed by a comma, values within a point separated by a space.
+    Points are rows of a float array, or single values if `group` is 1.
+    """
+    try:
+        return _POINTS_CODECS[group]
+    except KeyError:
+        pass
+
+    point_format = ', '.join(['%f'] * group) + ','
+
+    def from_text(text):
+        """ Returns float array for XML text (or default value). """
+        if isinstance(text, basestring):
+            values = numpy.array(text.replace(',', ' ').split(), dtype=float)
+        else:
+            values = numpy.array(text, dtype=float).ravel()
+        if group > 1:
+            if len(values) % group:
+                raise ValueError('%d values is not a multiple of %d'
+                                 % (len(values), group))
+            values = values.reshape((-1, group))
+        return values
+
+    def to_text(obj):
+        """ Returns XML text for point array. """
+        values = numpy.asarray(obj, dtype=float).ravel()
+        return (point_format * (len(values) // group)) % tuple(values)
+
+    _POINTS_CODECS[group] = (from_text, to_text)
+    return (from_text, to_text)
+
+
+def _escape(text):
+    """ Returns `text` escaped as ElementTree does for us-ascii output. """
+    if '&' in text:
+        text = text.replace('&', '&amp;')
+    if '<' in text:
+        text = text.replace('<', '&lt;')
+    if '>' in text:
+        text = text.replace('>', '&gt;')
+    if isinstance(text, unicode):
+        text = text.encode('us-ascii', 'xmlcharrefreplace')
+    return text